@@ -0,0 +1,67 @@
+"""store call embeddings as packed float32 blobs
+
+Revision ID: 002
+Revises: 001
+Create Date: 2026-10-15
+
+"""
+import json
+
+from alembic import op
+import numpy as np
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '002'
+down_revision = '001'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('calls', sa.Column('embedding_blob', sa.LargeBinary(), nullable=True))
+
+    # Backfill the packed float32 bytes from the JSON-encoded embeddings
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, embedding FROM calls WHERE embedding IS NOT NULL")
+    ).fetchall()
+    updates = [
+        {
+            'id': row.id,
+            'blob': np.asarray(json.loads(row.embedding), dtype=np.float32).tobytes(),
+        }
+        for row in rows
+    ]
+    if updates:
+        conn.execute(
+            sa.text("UPDATE calls SET embedding_blob = :blob WHERE id = :id"), updates
+        )
+
+    with op.batch_alter_table('calls') as batch_op:
+        batch_op.drop_column('embedding')
+        batch_op.alter_column('embedding_blob', new_column_name='embedding')
+
+
+def downgrade():
+    op.add_column('calls', sa.Column('embedding_json', sa.Text(), nullable=True))
+
+    conn = op.get_bind()
+    rows = conn.execute(
+        sa.text("SELECT id, embedding FROM calls WHERE embedding IS NOT NULL")
+    ).fetchall()
+    updates = [
+        {
+            'id': row.id,
+            'json': json.dumps(np.frombuffer(row.embedding, dtype=np.float32).tolist()),
+        }
+        for row in rows
+    ]
+    if updates:
+        conn.execute(
+            sa.text("UPDATE calls SET embedding_json = :json WHERE id = :id"), updates
+        )
+
+    with op.batch_alter_table('calls') as batch_op:
+        batch_op.drop_column('embedding')
+        batch_op.alter_column('embedding_json', new_column_name='embedding')
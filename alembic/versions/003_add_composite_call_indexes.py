@@ -0,0 +1,34 @@
+"""add composite indexes for the call filter predicates
+
+Revision ID: 003
+Revises: 002
+Create Date: 2026-10-15
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '003'
+down_revision = '002'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_index(
+        'ix_calls_agent_start', 'calls', ['agent_id', 'start_time'], unique=False
+    )
+    op.create_index(
+        'ix_calls_sentiment_agent',
+        'calls',
+        ['customer_sentiment_score', 'agent_id'],
+        unique=False,
+    )
+
+    # Refresh planner statistics so the new indexes are picked up
+    op.execute('ANALYZE')
+
+
+def downgrade():
+    op.drop_index('ix_calls_sentiment_agent', table_name='calls')
+    op.drop_index('ix_calls_agent_start', table_name='calls')
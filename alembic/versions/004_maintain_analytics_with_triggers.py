@@ -0,0 +1,137 @@
+"""maintain agent analytics incrementally with triggers on calls
+
+Revision ID: 004
+Revises: 003
+Create Date: 2026-10-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '004'
+down_revision = '003'
+branch_labels = None
+depends_on = None
+
+# Row ids for analytics rows created inside the triggers
+NEW_ID_SQL = {
+    'sqlite': 'lower(hex(randomblob(16)))',
+    'postgresql': 'CAST(gen_random_uuid() AS TEXT)',
+}
+
+ADD_CALL_SQL = """
+    INSERT INTO analytics (
+        id, agent_id, sum_sentiment, sum_talk_ratio, total_calls,
+        avg_sentiment, avg_talk_ratio, last_updated
+    )
+    VALUES (
+        {new_id}, NEW.agent_id,
+        COALESCE(NEW.customer_sentiment_score, 0.0),
+        COALESCE(NEW.agent_talk_ratio, 0.0), 1,
+        COALESCE(NEW.customer_sentiment_score, 0.0),
+        COALESCE(NEW.agent_talk_ratio, 0.0), CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (agent_id) DO UPDATE SET
+        sum_sentiment = COALESCE(analytics.sum_sentiment, 0.0)
+            + excluded.sum_sentiment,
+        sum_talk_ratio = COALESCE(analytics.sum_talk_ratio, 0.0)
+            + excluded.sum_talk_ratio,
+        total_calls = COALESCE(analytics.total_calls, 0) + 1,
+        avg_sentiment = (COALESCE(analytics.sum_sentiment, 0.0)
+            + excluded.sum_sentiment) / (COALESCE(analytics.total_calls, 0) + 1),
+        avg_talk_ratio = (COALESCE(analytics.sum_talk_ratio, 0.0)
+            + excluded.sum_talk_ratio) / (COALESCE(analytics.total_calls, 0) + 1),
+        last_updated = CURRENT_TIMESTAMP;
+"""
+
+REMOVE_CALL_SQL = """
+    UPDATE analytics SET
+        sum_sentiment = COALESCE(sum_sentiment, 0.0)
+            - COALESCE(OLD.customer_sentiment_score, 0.0),
+        sum_talk_ratio = COALESCE(sum_talk_ratio, 0.0)
+            - COALESCE(OLD.agent_talk_ratio, 0.0),
+        total_calls = total_calls - 1,
+        avg_sentiment = (COALESCE(sum_sentiment, 0.0)
+            - COALESCE(OLD.customer_sentiment_score, 0.0)) / NULLIF(total_calls - 1, 0),
+        avg_talk_ratio = (COALESCE(sum_talk_ratio, 0.0)
+            - COALESCE(OLD.agent_talk_ratio, 0.0)) / NULLIF(total_calls - 1, 0),
+        last_updated = CURRENT_TIMESTAMP
+    WHERE agent_id = OLD.agent_id;
+    DELETE FROM analytics WHERE agent_id = OLD.agent_id AND total_calls <= 0;
+"""
+
+SQLITE_ADD_CALL_SQL = ADD_CALL_SQL.format(new_id=NEW_ID_SQL['sqlite'])
+POSTGRES_ADD_CALL_SQL = ADD_CALL_SQL.format(new_id=NEW_ID_SQL['postgresql'])
+
+SQLITE_TRIGGERS = {
+    'calls_analytics_ai': f"AFTER INSERT ON calls BEGIN {SQLITE_ADD_CALL_SQL} END",
+    'calls_analytics_ad': f"AFTER DELETE ON calls BEGIN {REMOVE_CALL_SQL} END",
+    'calls_analytics_au': (
+        "AFTER UPDATE OF agent_id, customer_sentiment_score, agent_talk_ratio ON calls "
+        f"BEGIN {REMOVE_CALL_SQL} {SQLITE_ADD_CALL_SQL} END"
+    ),
+}
+
+# PostgreSQL runs one plpgsql function for all three events
+POSTGRES_FUNCTION = (
+    "CREATE OR REPLACE FUNCTION calls_analytics_sync() RETURNS trigger AS $$ "
+    f"BEGIN IF TG_OP <> 'INSERT' THEN {REMOVE_CALL_SQL} END IF; "
+    f"IF TG_OP <> 'DELETE' THEN {POSTGRES_ADD_CALL_SQL} END IF; "
+    "RETURN NULL; END; $$ LANGUAGE plpgsql"
+)
+POSTGRES_TRIGGER = (
+    "CREATE TRIGGER calls_analytics AFTER INSERT OR DELETE OR UPDATE OF "
+    "agent_id, customer_sentiment_score, agent_talk_ratio ON calls "
+    "FOR EACH ROW EXECUTE FUNCTION calls_analytics_sync()"
+)
+
+
+def upgrade():
+    op.add_column('analytics', sa.Column('sum_sentiment', sa.Float(), nullable=True))
+    op.add_column('analytics', sa.Column('sum_talk_ratio', sa.Float(), nullable=True))
+
+    # Other dialects have no triggers; the API aggregates calls on read there
+    dialect = op.get_bind().dialect.name
+    if dialect not in NEW_ID_SQL:
+        return
+
+    # Rebuild the running totals from the existing calls
+    op.execute('DELETE FROM analytics')
+    op.execute(
+        f"""
+        INSERT INTO analytics (
+            id, agent_id, sum_sentiment, sum_talk_ratio, total_calls,
+            avg_sentiment, avg_talk_ratio, last_updated
+        )
+        SELECT
+            {NEW_ID_SQL[dialect]}, agent_id,
+            SUM(COALESCE(customer_sentiment_score, 0.0)),
+            SUM(COALESCE(agent_talk_ratio, 0.0)), COUNT(*),
+            AVG(COALESCE(customer_sentiment_score, 0.0)),
+            AVG(COALESCE(agent_talk_ratio, 0.0)), CURRENT_TIMESTAMP
+        FROM calls
+        GROUP BY agent_id
+        """
+    )
+
+    if dialect == 'sqlite':
+        for name, body in SQLITE_TRIGGERS.items():
+            op.execute(f"CREATE TRIGGER {name} {body}")
+    else:
+        op.execute(POSTGRES_FUNCTION)
+        op.execute(POSTGRES_TRIGGER)
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for name in SQLITE_TRIGGERS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    elif dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS calls_analytics ON calls")
+        op.execute("DROP FUNCTION IF EXISTS calls_analytics_sync()")
+
+    with op.batch_alter_table('analytics') as batch_op:
+        batch_op.drop_column('sum_talk_ratio')
+        batch_op.drop_column('sum_sentiment')
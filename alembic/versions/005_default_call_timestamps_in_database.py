@@ -0,0 +1,55 @@
+"""default call timestamps in the database
+
+Revision ID: 005
+Revises: 004
+Create Date: 2026-10-15
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '005'
+down_revision = '004'
+branch_labels = None
+depends_on = None
+
+
+def _alter_timestamps(server_default):
+    conn = op.get_bind()
+    if conn.dialect.name != 'sqlite':
+        op.alter_column(
+            'calls', 'created_at', existing_type=sa.DateTime(),
+            server_default=server_default,
+        )
+        op.alter_column(
+            'calls', 'updated_at', existing_type=sa.DateTime(),
+            server_default=server_default,
+        )
+        return
+
+    # Batch mode rebuilds the SQLite table, which drops its triggers, so
+    # capture them first and recreate them afterwards
+    triggers = conn.execute(
+        sa.text(
+            "SELECT sql FROM sqlite_master "
+            "WHERE type = 'trigger' AND tbl_name = 'calls'"
+        )
+    ).scalars().all()
+
+    with op.batch_alter_table('calls') as batch_op:
+        for column in ('created_at', 'updated_at'):
+            batch_op.alter_column(
+                column, existing_type=sa.DateTime(), server_default=server_default
+            )
+
+    for trigger in triggers:
+        op.execute(trigger)
+
+
+def upgrade():
+    _alter_timestamps(sa.func.now())
+
+
+def downgrade():
+    _alter_timestamps(None)
@@ -0,0 +1,23 @@
+"""drop the agent_id index covered by ix_calls_agent_start
+
+Revision ID: 006
+Revises: 005
+Create Date: 2026-10-15
+
+"""
+from alembic import op
+
+# revision identifiers, used by Alembic.
+revision = '006'
+down_revision = '005'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # agent_id-only lookups use the leftmost prefix of ix_calls_agent_start
+    op.drop_index('ix_calls_agent_id', table_name='calls')
+
+
+def downgrade():
+    op.create_index('ix_calls_agent_id', 'calls', ['agent_id'], unique=False)
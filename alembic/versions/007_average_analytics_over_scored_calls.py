@@ -0,0 +1,192 @@
+"""average analytics over scored calls only
+
+Revision ID: 007
+Revises: 006
+Create Date: 2026-10-15
+
+"""
+import importlib.util
+import os
+
+from alembic import op
+import sqlalchemy as sa
+
+# revision identifiers, used by Alembic.
+revision = '007'
+down_revision = '006'
+branch_labels = None
+depends_on = None
+
+# Row ids for analytics rows created inside the triggers
+NEW_ID_SQL = {
+    'sqlite': 'lower(hex(randomblob(16)))',
+    'postgresql': 'CAST(gen_random_uuid() AS TEXT)',
+}
+
+ADD_CALL_SQL = """
+    INSERT INTO analytics (
+        id, agent_id, sum_sentiment, sum_talk_ratio, scored_sentiment_calls,
+        scored_talk_calls, total_calls, avg_sentiment, avg_talk_ratio,
+        last_updated
+    )
+    VALUES (
+        {new_id}, NEW.agent_id,
+        COALESCE(NEW.customer_sentiment_score, 0.0),
+        COALESCE(NEW.agent_talk_ratio, 0.0),
+        CASE WHEN NEW.customer_sentiment_score IS NULL THEN 0 ELSE 1 END,
+        CASE WHEN NEW.agent_talk_ratio IS NULL THEN 0 ELSE 1 END, 1,
+        NEW.customer_sentiment_score, NEW.agent_talk_ratio, CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (agent_id) DO UPDATE SET
+        sum_sentiment = COALESCE(analytics.sum_sentiment, 0.0)
+            + excluded.sum_sentiment,
+        sum_talk_ratio = COALESCE(analytics.sum_talk_ratio, 0.0)
+            + excluded.sum_talk_ratio,
+        scored_sentiment_calls = COALESCE(analytics.scored_sentiment_calls, 0)
+            + excluded.scored_sentiment_calls,
+        scored_talk_calls = COALESCE(analytics.scored_talk_calls, 0)
+            + excluded.scored_talk_calls,
+        total_calls = COALESCE(analytics.total_calls, 0) + 1,
+        avg_sentiment = (COALESCE(analytics.sum_sentiment, 0.0)
+            + excluded.sum_sentiment) / NULLIF(
+                COALESCE(analytics.scored_sentiment_calls, 0)
+                + excluded.scored_sentiment_calls, 0),
+        avg_talk_ratio = (COALESCE(analytics.sum_talk_ratio, 0.0)
+            + excluded.sum_talk_ratio) / NULLIF(
+                COALESCE(analytics.scored_talk_calls, 0)
+                + excluded.scored_talk_calls, 0),
+        last_updated = CURRENT_TIMESTAMP;
+"""
+REMOVE_CALL_SQL = """
+    UPDATE analytics SET
+        sum_sentiment = COALESCE(sum_sentiment, 0.0)
+            - COALESCE(OLD.customer_sentiment_score, 0.0),
+        sum_talk_ratio = COALESCE(sum_talk_ratio, 0.0)
+            - COALESCE(OLD.agent_talk_ratio, 0.0),
+        scored_sentiment_calls = COALESCE(scored_sentiment_calls, 0)
+            - CASE WHEN OLD.customer_sentiment_score IS NULL THEN 0 ELSE 1 END,
+        scored_talk_calls = COALESCE(scored_talk_calls, 0)
+            - CASE WHEN OLD.agent_talk_ratio IS NULL THEN 0 ELSE 1 END,
+        total_calls = total_calls - 1,
+        avg_sentiment = (COALESCE(sum_sentiment, 0.0)
+            - COALESCE(OLD.customer_sentiment_score, 0.0)) / NULLIF(
+                COALESCE(scored_sentiment_calls, 0)
+                - CASE WHEN OLD.customer_sentiment_score IS NULL THEN 0 ELSE 1 END,
+                0),
+        avg_talk_ratio = (COALESCE(sum_talk_ratio, 0.0)
+            - COALESCE(OLD.agent_talk_ratio, 0.0)) / NULLIF(
+                COALESCE(scored_talk_calls, 0)
+                - CASE WHEN OLD.agent_talk_ratio IS NULL THEN 0 ELSE 1 END,
+                0),
+        last_updated = CURRENT_TIMESTAMP
+    WHERE agent_id = OLD.agent_id;
+    DELETE FROM analytics WHERE agent_id = OLD.agent_id AND total_calls <= 0;
+"""
+SQLITE_TRIGGER_EVENTS = {
+    'calls_analytics_ai': "AFTER INSERT ON calls BEGIN {add} END",
+    'calls_analytics_ad': "AFTER DELETE ON calls BEGIN {remove} END",
+    'calls_analytics_au': (
+        "AFTER UPDATE OF agent_id, customer_sentiment_score, agent_talk_ratio ON calls "
+        "BEGIN {remove} {add} END"
+    ),
+}
+
+POSTGRES_FUNCTION = (
+    "CREATE OR REPLACE FUNCTION calls_analytics_sync() RETURNS trigger AS $$ "
+    "BEGIN IF TG_OP <> 'INSERT' THEN {remove} END IF; "
+    "IF TG_OP <> 'DELETE' THEN {add} END IF; "
+    "RETURN NULL; END; $$ LANGUAGE plpgsql"
+)
+
+
+def _previous_revision():
+    """Load revision 004, whose triggers and rebuild downgrade restores."""
+    path = os.path.join(
+        os.path.dirname(__file__), '004_maintain_analytics_with_triggers.py'
+    )
+    spec = importlib.util.spec_from_file_location('revision_004', path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def _replace_triggers(dialect, add_sql, remove_sql):
+    if dialect == 'sqlite':
+        for name, body in SQLITE_TRIGGER_EVENTS.items():
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+            op.execute(
+                f"CREATE TRIGGER {name} "
+                + body.format(add=add_sql, remove=remove_sql)
+            )
+    else:
+        # The trigger itself calls the function by name, so replacing the
+        # function body is enough
+        op.execute(POSTGRES_FUNCTION.format(add=add_sql, remove=remove_sql))
+
+
+def upgrade():
+    op.add_column(
+        'analytics', sa.Column('scored_sentiment_calls', sa.Integer(), nullable=True)
+    )
+    op.add_column(
+        'analytics', sa.Column('scored_talk_calls', sa.Integer(), nullable=True)
+    )
+
+    # Other dialects have no triggers; the API aggregates calls on read there
+    dialect = op.get_bind().dialect.name
+    if dialect not in NEW_ID_SQL:
+        return
+
+    # Rebuild the totals from the existing calls. COUNT and AVG skip NULLs,
+    # so calls without a score no longer count as 0
+    op.execute('DELETE FROM analytics')
+    op.execute(
+        f"""
+        INSERT INTO analytics (
+            id, agent_id, sum_sentiment, sum_talk_ratio, scored_sentiment_calls,
+            scored_talk_calls, total_calls, avg_sentiment, avg_talk_ratio,
+            last_updated
+        )
+        SELECT
+            {NEW_ID_SQL[dialect]}, agent_id,
+            SUM(COALESCE(customer_sentiment_score, 0.0)),
+            SUM(COALESCE(agent_talk_ratio, 0.0)),
+            COUNT(customer_sentiment_score), COUNT(agent_talk_ratio), COUNT(*),
+            AVG(customer_sentiment_score), AVG(agent_talk_ratio), CURRENT_TIMESTAMP
+        FROM calls
+        GROUP BY agent_id
+        """
+    )
+
+    _replace_triggers(
+        dialect,
+        ADD_CALL_SQL.format(new_id=NEW_ID_SQL[dialect]),
+        REMOVE_CALL_SQL,
+    )
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        # Rebuilding analytics in batch mode fails while triggers on calls
+        # reference it, so drop them until the columns are gone
+        for name in SQLITE_TRIGGER_EVENTS:
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+
+    with op.batch_alter_table('analytics') as batch_op:
+        batch_op.drop_column('scored_talk_calls')
+        batch_op.drop_column('scored_sentiment_calls')
+
+    if dialect in NEW_ID_SQL:
+        previous = _previous_revision()
+        _replace_triggers(
+            dialect,
+            previous.ADD_CALL_SQL.format(new_id=NEW_ID_SQL[dialect]),
+            previous.REMOVE_CALL_SQL,
+        )
+        # Back to averaging unscored calls as 0, as revision 004 does
+        op.execute(
+            "UPDATE analytics SET "
+            "avg_sentiment = COALESCE(sum_sentiment, 0.0) / NULLIF(total_calls, 0), "
+            "avg_talk_ratio = COALESCE(sum_talk_ratio, 0.0) / NULLIF(total_calls, 0)"
+        )
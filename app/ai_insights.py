@@ -1,32 +1,55 @@
 import logging
 import os
 import re
-from typing import Any, Dict, List, Optional
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Union
 
 import numpy as np
+import torch
 from openai import OpenAI
 from sentence_transformers import SentenceTransformer
-from sklearn.metrics.pairwise import cosine_similarity
-from transformers import pipeline
+from torch.ao.quantization import quantize_dynamic
+from transformers import AutoModelForSequenceClassification, AutoTokenizer
+
+from app import sim_kernels
+from app.inference_cache import InferenceCache
+from app.onnx_encoder import OnnxSentenceEncoder
 
 logger = logging.getLogger(__name__)
 
+# Number of texts per forward pass in the batched inference helpers
+BATCH_SIZE = 32
+
+SENTIMENT_MODEL = "distilbert-base-uncased-finetuned-sst-2-english"
+
 
 class AIInsightModule:
+    # Speaker labels and word tokens used by calculate_agent_talk_ratio
+    _agent_prefix_re = re.compile(r"^(?:agent|a):\s*", re.IGNORECASE)
+    _customer_prefix_re = re.compile(r"^(?:customer|c):\s*", re.IGNORECASE)
+    _word_re = re.compile(r"\b\w+\b")
+
     def __init__(self):
-        self.embedding_model = SentenceTransformer(
-            "sentence-transformers/all-MiniLM-L6-v2"
-        )
-        # Use a more reliable sentiment analysis model for testing
+        # Let intra-op parallelism use every core for CPU inference
+        torch.set_num_threads(os.cpu_count() or 1)
+
+        self.embedding_model = self._load_embedding_model()
+        # Use a more reliable sentiment analysis model for testing. The tokenizer
+        # and model are called directly rather than through a pipeline wrapper
+        self.sentiment_tokenizer = None
+        self.sentiment_model = None
         try:
-            self.sentiment_pipeline = pipeline(
-                "sentiment-analysis",
-                model="distilbert-base-uncased-finetuned-sst-2-english",
-                top_k=None,
+            self.sentiment_tokenizer = AutoTokenizer.from_pretrained(SENTIMENT_MODEL)
+            self.sentiment_model = AutoModelForSequenceClassification.from_pretrained(
+                SENTIMENT_MODEL
+            ).eval()
+            self._sentiment_weights = self._label_weights(
+                self.sentiment_model.config.id2label
             )
         except Exception as e:
             logger.warning(f"Failed to load sentiment model: {e}")
-            self.sentiment_pipeline = None
+            self.sentiment_tokenizer = None
+            self.sentiment_model = None
 
         # Initialize OpenAI client if API key is available
         self.openai_client = None
@@ -36,59 +59,160 @@ class AIInsightModule:
             except Exception as e:
                 logger.warning(f"Failed to initialize OpenAI client: {e}")
 
-    def generate_embedding(self, text: str) -> List[float]:
-        """Generate sentence embedding for the given text."""
+        # Reuse model outputs for repeated (or, optionally, near-identical) transcripts
+        near_duplicates = os.getenv("NEAR_DUPLICATE_CACHE", "false").lower() == "true"
+        self.embedding_cache = InferenceCache(near_duplicates=near_duplicates)
+        self.sentiment_cache = InferenceCache(near_duplicates=near_duplicates)
+        # LLM coaching tips keyed by bucketed metrics and the transcript opening
+        self.nudge_cache = InferenceCache()
+
+        # Optionally run both transformer models with int8 weights
+        if os.getenv("QUANTIZE_MODELS", "false").lower() == "true":
+            self._quantize_models()
+
+        # Only preloaded models are inherited by forked workers; otherwise the
+        # copy into /dev/shm (64MB by default in Docker) buys nothing
+        if os.getenv("PRELOAD_MODELS", "false").lower() == "true":
+            self._share_memory()
+
+    def _load_embedding_model(self):
+        """Load the ONNX Runtime encoder if configured, else sentence-transformers."""
+        onnx_path = os.getenv("EMBEDDING_ONNX_PATH")
+        if onnx_path:
+            try:
+                return OnnxSentenceEncoder(onnx_path)
+            except Exception as e:
+                logger.warning(f"Failed to load ONNX embedding model: {e}")
+
+        return SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
+
+    def _quantize_models(self) -> None:
+        """Swap the models' Linear layers for dynamically quantized int8 ones."""
         try:
-            embedding = self.embedding_model.encode(text)
-            return list(embedding.tolist())
+            if isinstance(self.embedding_model, torch.nn.Module):
+                quantize_dynamic(
+                    self.embedding_model,
+                    {torch.nn.Linear},
+                    dtype=torch.qint8,
+                    inplace=True,
+                )
+            if self.sentiment_model:
+                quantize_dynamic(
+                    self.sentiment_model,
+                    {torch.nn.Linear},
+                    dtype=torch.qint8,
+                    inplace=True,
+                )
+            logger.info("Quantized embedding and sentiment models to int8")
         except Exception as e:
-            logger.error(f"Error generating embedding: {e}")
-            return []
+            logger.warning(f"Failed to quantize models, using float32: {e}")
+
+    def _share_memory(self) -> None:
+        """Move model weights to shared memory so forked workers reuse them."""
+        try:
+            if isinstance(self.embedding_model, torch.nn.Module):
+                self.embedding_model.share_memory()
+            if self.sentiment_model:
+                self.sentiment_model.share_memory()
+        except Exception as e:
+            logger.warning(f"Failed to move model weights to shared memory: {e}")
+
+    def generate_embedding(self, text: str) -> List[float]:
+        """Generate sentence embedding for the given text."""
+        return self.generate_embeddings([text])[0]
+
+    def generate_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """Generate normalized sentence embeddings for a batch of texts."""
+        results = [self.embedding_cache.get(text) for text in texts]
+        misses = self._group_misses(texts, results)
+
+        if misses:
+            try:
+                # Inputs longer than the model's max_seq_length are truncated
+                # by the encoder
+                embeddings = self.embedding_model.encode(
+                    list(misses),
+                    batch_size=BATCH_SIZE,
+                    convert_to_numpy=True,
+                    normalize_embeddings=True,
+                )
+                for (text, positions), embedding in zip(misses.items(), embeddings):
+                    result = tuple(embedding.tolist())
+                    self.embedding_cache.put(text, result)
+                    for i in positions:
+                        results[i] = result
+            except Exception as e:
+                logger.error(f"Error generating embeddings: {e}")
+                for positions in misses.values():
+                    for i in positions:
+                        results[i] = ()
+
+        return [list(result) for result in results]
 
     def analyze_sentiment(self, text: str) -> float:
         """Analyze sentiment and return score between -1 and 1."""
-        if not self.sentiment_pipeline:
-            return 0.0
+        return self.analyze_sentiments([text])[0]
 
-        try:
-            results = self.sentiment_pipeline(text)
-            logger.debug(f"Sentiment pipeline results for '{text[:50]}': {results}")
-
-            # Handle different model outputs
-            # Results format: [[{label: 'POSITIVE', score: 0.99}, {label: 'NEGATIVE', score: 0.01}]]
-            if (
-                isinstance(results, list)
-                and len(results) > 0
-                and isinstance(results[0], list)
-            ):
-                # For distilbert model (POSITIVE/NEGATIVE labels)
-                sentiment_score = 0.0
-                for result in results[0]:  # Access the inner list
-                    if result["label"] == "NEGATIVE":
-                        sentiment_score -= result["score"]
-                    elif result["label"] == "POSITIVE":
-                        sentiment_score += result["score"]
-                    # For older models with LABEL_X format
-                    elif result["label"] == "LABEL_0":  # Negative
-                        sentiment_score -= result["score"]
-                    elif result["label"] == "LABEL_2":  # Positive
-                        sentiment_score += result["score"]
-                    # LABEL_1 or neutral contributes 0
-
-                return max(-1.0, min(1.0, sentiment_score))
-
-            return 0.0
-        except Exception as e:
-            logger.error(f"Error analyzing sentiment: {e}")
-            return 0.0
+    def analyze_sentiments(self, texts: List[str]) -> List[float]:
+        """Analyze sentiment for a batch of texts, scoring each between -1 and 1."""
+        if not self.sentiment_model:
+            return [0.0 for _ in texts]
+
+        results = [self.sentiment_cache.get(text) for text in texts]
+        misses = self._group_misses(texts, results)
+
+        if misses:
+            unique_texts = list(misses)
+            try:
+                for start in range(0, len(unique_texts), BATCH_SIZE):
+                    batch = unique_texts[start : start + BATCH_SIZE]
+                    for text, score in zip(batch, self._score_sentiments(batch)):
+                        self.sentiment_cache.put(text, score)
+                        for i in misses[text]:
+                            results[i] = score
+            except Exception as e:
+                logger.error(f"Error analyzing sentiment: {e}")
+                for i, result in enumerate(results):
+                    if result is None:
+                        results[i] = 0.0
+
+        return results
+
+    @staticmethod
+    def _group_misses(texts: List[str], results: List) -> Dict[str, List[int]]:
+        """Map each uncached text to its positions so repeats run only once."""
+        misses: Dict[str, List[int]] = {}
+        for i, result in enumerate(results):
+            if result is None:
+                misses.setdefault(texts[i], []).append(i)
+        return misses
+
+    def _score_sentiments(self, texts: List[str]) -> List[float]:
+        """Run one forward pass and collapse label probabilities into scores."""
+        inputs = self.sentiment_tokenizer(
+            texts, padding=True, truncation=True, return_tensors="pt"
+        )
+        with torch.inference_mode():
+            logits = self.sentiment_model(**inputs).logits
+        probabilities = torch.softmax(logits, dim=-1)
+        scores = (probabilities @ self._sentiment_weights).clamp(-1.0, 1.0)
+        return scores.tolist()
+
+    @staticmethod
+    def _label_weights(id2label: Dict[int, str]) -> torch.Tensor:
+        """Map each class to +1 (positive), -1 (negative) or 0 (neutral)."""
+        # distilbert uses POSITIVE/NEGATIVE, older models LABEL_0 (negative)
+        # and LABEL_2 (positive); LABEL_1 or neutral contributes 0
+        signs = {"POSITIVE": 1.0, "LABEL_2": 1.0, "NEGATIVE": -1.0, "LABEL_0": -1.0}
+        return torch.tensor(
+            [signs.get(id2label[i].upper(), 0.0) for i in range(len(id2label))]
+        )
 
     def calculate_agent_talk_ratio(self, transcript: str) -> float:
         """Calculate the ratio of agent words to total words."""
         try:
-            # Simple heuristic: assume lines starting with "Agent:" or "A:" are agent speech
-            agent_patterns = [r"^Agent:", r"^A:", r"^AGENT:", r"^agent:"]
-            customer_patterns = [r"^Customer:", r"^C:", r"^CUSTOMER:", r"^customer:"]
-
+            # Simple heuristic: assume lines starting with "Agent:" or "A:" are
+            # agent speech
             lines = transcript.split("\n")
             agent_words = 0
             customer_words = 0
@@ -98,20 +222,19 @@ class AIInsightModule:
                 if not line:
                     continue
 
-                is_agent = any(re.match(pattern, line) for pattern in agent_patterns)
-                is_customer = any(
-                    re.match(pattern, line) for pattern in customer_patterns
+                agent_match = self._agent_prefix_re.match(line)
+                customer_match = (
+                    None if agent_match else self._customer_prefix_re.match(line)
                 )
 
                 # Remove speaker labels and count words
-                clean_line = re.sub(
-                    r"^(Agent|A|Customer|C|AGENT|CUSTOMER|agent|customer):\s*", "", line
-                )
-                words = len(re.findall(r"\b\w+\b", clean_line))
+                speaker_match = agent_match or customer_match
+                clean_line = line[speaker_match.end() :] if speaker_match else line
+                words = len(self._word_re.findall(clean_line))
 
-                if is_agent:
+                if agent_match:
                     agent_words += words
-                elif is_customer:
+                elif customer_match:
                     customer_words += words
                 else:
                     # If no clear speaker, split 50/50
@@ -127,37 +250,48 @@ class AIInsightModule:
 
     def find_similar_calls(
         self,
-        target_embedding: List[float],
+        target_embedding: Union[List[float], np.ndarray],
         call_embeddings: List[Dict[str, Any]],
         top_k: int = 5,
     ) -> List[Dict[str, Any]]:
         """Find the most similar calls based on cosine similarity."""
         try:
-            if not target_embedding or not call_embeddings:
+            if target_embedding is None or len(target_embedding) == 0:
                 return []
 
-            target_emb = np.array(target_embedding).reshape(1, -1)
-            similarities = []
-
-            for call_data in call_embeddings:
-                if not call_data.get("embedding"):
-                    continue
+            # Only score calls with valid embeddings
+            valid_calls = [
+                call_data
+                for call_data in call_embeddings
+                if call_data.get("embedding") is not None
+                and len(call_data["embedding"]) > 0
+            ]
+            if not valid_calls:
+                return []
 
-                call_emb = np.array(call_data["embedding"]).reshape(1, -1)
-                similarity = cosine_similarity(target_emb, call_emb)[0][0]
+            # Stack candidates into one (N, D) matrix and score them in a single
+            # pass against the normalized target
+            matrix = np.asarray(
+                [call_data["embedding"] for call_data in valid_calls], dtype=np.float32
+            )
+            # Not in place: the caller's array may be read-only or still in use
+            target = np.asarray(target_embedding, dtype=np.float32)
+            target = target / (np.linalg.norm(target) + sim_kernels.EPS)
+            similarities = sim_kernels.cosine_scores(matrix, target)
 
-                similarities.append(
-                    {
-                        "call_id": call_data["call_id"],
-                        "agent_id": call_data["agent_id"],
-                        "similarity_score": float(similarity),
-                        "transcript_preview": call_data["transcript"][:200] + "...",
-                    }
-                )
+            # Select the top k without sorting every candidate, and only build
+            # previews for the calls that are returned
+            top_indices = sim_kernels.top_k_indices(similarities, top_k)
 
-            # Sort by similarity and return top k
-            similarities.sort(key=lambda x: x["similarity_score"], reverse=True)
-            return similarities[:top_k]
+            return [
+                {
+                    "call_id": valid_calls[i]["call_id"],
+                    "agent_id": valid_calls[i]["agent_id"],
+                    "similarity_score": float(similarities[i]),
+                    "transcript_preview": valid_calls[i]["transcript"][:200] + "...",
+                }
+                for i in top_indices
+            ]
 
         except Exception as e:
             logger.error(f"Error finding similar calls: {e}")
@@ -171,35 +305,22 @@ class AIInsightModule:
 
         try:
             if self.openai_client:
-                # Use OpenAI for more sophisticated nudges
-                prompt = f"""
-                Based on this sales call analysis:
-                - Sentiment score: {sentiment_score:.2f} (-1 to 1 scale)
-                - Agent talk ratio: {talk_ratio:.2f}
-                - Transcript preview: {transcript[:300]}...
-                
-                Generate 3 brief coaching tips (max 40 words each) for the sales agent.
-                Focus on practical improvements.
-                """
-
-                try:
-                    response = self.openai_client.chat.completions.create(
-                        model="gpt-3.5-turbo",
-                        messages=[{"role": "user", "content": prompt}],
-                        max_tokens=200,
-                        temperature=0.7,
+                # Tips only depend on coarse buckets of the metrics, so identical
+                # or near-identical calls reuse an earlier completion
+                sentiment_bucket = round(sentiment_score, 1)
+                talk_ratio_bucket = round(talk_ratio, 1)
+                preview = transcript[:300]
+                cache_key = f"{sentiment_bucket}|{talk_ratio_bucket}|{preview}"
+
+                cached = self.nudge_cache.get(cache_key)
+                if cached is not None:
+                    nudges = list(cached)
+                else:
+                    nudges = self._generate_llm_nudges(
+                        preview, sentiment_bucket, talk_ratio_bucket
                     )
-
-                    content = response.choices[0].message.content
-                    if content:
-                        nudges = [
-                            line.strip() for line in content.split("\n") if line.strip()
-                        ][:3]
-                    else:
-                        nudges = []
-                except Exception as e:
-                    logger.warning(f"OpenAI API error, falling back to rule-based: {e}")
-                    nudges = []
+                    if nudges:
+                        self.nudge_cache.put(cache_key, tuple(nudges))
 
             # Fallback to rule-based nudges if OpenAI fails or isn't available
             if not nudges:
@@ -216,6 +337,36 @@ class AIInsightModule:
                 "Empathize with customer needs",
             ]
 
+    def _generate_llm_nudges(
+        self, preview: str, sentiment_score: float, talk_ratio: float
+    ) -> List[str]:
+        """Ask the OpenAI API for coaching tips, returning [] on failure."""
+        # Use OpenAI for more sophisticated nudges
+        prompt = f"""
+        Based on this sales call analysis:
+        - Sentiment score: {sentiment_score:.2f} (-1 to 1 scale)
+        - Agent talk ratio: {talk_ratio:.2f}
+        - Transcript preview: {preview}...
+        
+        Generate 3 brief coaching tips (max 40 words each) for the sales agent.
+        Focus on practical improvements.
+        """
+
+        try:
+            response = self.openai_client.chat.completions.create(
+                model="gpt-3.5-turbo",
+                messages=[{"role": "user", "content": prompt}],
+                max_tokens=200,
+                temperature=0.7,
+            )
+
+            content = response.choices[0].message.content or ""
+            lines = [line.strip() for line in content.split("\n") if line.strip()]
+            return lines[:3]
+        except Exception as e:
+            logger.warning(f"OpenAI API error, falling back to rule-based: {e}")
+            return []
+
     def _generate_rule_based_nudges(
         self, sentiment_score: float, talk_ratio: float
     ) -> List[str]:
@@ -243,3 +394,9 @@ class AIInsightModule:
             nudges.extend(general_nudges[: 3 - len(nudges)])
 
         return nudges[:3]
+
+
+@lru_cache(maxsize=None)
+def get_ai_module() -> AIInsightModule:
+    """Return the process-wide AIInsightModule, loading the models on first use."""
+    return AIInsightModule()
@@ -0,0 +1,80 @@
+import uuid
+from datetime import datetime
+
+from sqlalchemy import func, select
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from app.models import Analytics, Call
+
+# Dialect-specific INSERT constructs that support ON CONFLICT DO UPDATE
+UPSERT_INSERTS = {"sqlite": sqlite.insert, "postgresql": postgresql.insert}
+
+# Agents per multi-row upsert. At 10 columns a row this stays under SQLite's
+# default limit of 32766 bound parameters per statement
+UPSERT_CHUNK_SIZE = 3000
+
+
+def upsert_agent_analytics(db: Session) -> int:
+    """Rebuild every agent's analytics row from calls, returning the agent count.
+
+    The caller commits.
+    """
+    # Aggregate every agent in one query. Sums treat a missing score as 0,
+    # but averages divide only by the calls that have one, the same way the
+    # analytics triggers on calls maintain them
+    aggregated = db.execute(
+        select(
+            Call.agent_id,
+            func.sum(func.coalesce(Call.customer_sentiment_score, 0.0)).label(
+                "sum_sentiment"
+            ),
+            func.sum(func.coalesce(Call.agent_talk_ratio, 0.0)).label(
+                "sum_talk_ratio"
+            ),
+            func.count(Call.customer_sentiment_score).label("scored_sentiment_calls"),
+            func.count(Call.agent_talk_ratio).label("scored_talk_calls"),
+            func.count(Call.id).label("total_calls"),
+        ).group_by(Call.agent_id)
+    ).all()
+
+    now = datetime.utcnow()
+    rows = [
+        {
+            "id": str(uuid.uuid4()),
+            "agent_id": row.agent_id,
+            "sum_sentiment": row.sum_sentiment,
+            "sum_talk_ratio": row.sum_talk_ratio,
+            "scored_sentiment_calls": row.scored_sentiment_calls,
+            "scored_talk_calls": row.scored_talk_calls,
+            "total_calls": row.total_calls,
+            "avg_sentiment": (
+                row.sum_sentiment / row.scored_sentiment_calls
+                if row.scored_sentiment_calls
+                else None
+            ),
+            "avg_talk_ratio": (
+                row.sum_talk_ratio / row.scored_talk_calls
+                if row.scored_talk_calls
+                else None
+            ),
+            "last_updated": now,
+        }
+        for row in aggregated
+    ]
+
+    # Update or create analytics records with one statement per chunk
+    insert = UPSERT_INSERTS[db.get_bind().dialect.name]
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        stmt = insert(Analytics).values(rows[start : start + UPSERT_CHUNK_SIZE])
+        stmt = stmt.on_conflict_do_update(
+            index_elements=[Analytics.agent_id],
+            set_={
+                column: stmt.excluded[column]
+                for column in rows[0]
+                if column not in ("id", "agent_id")
+            },
+        )
+        db.execute(stmt)
+
+    return len(aggregated)
@@ -1,27 +1,32 @@
 import asyncio
+import hashlib
 import json
 import logging
-import random
+import os
 from datetime import datetime
 from typing import List, Optional
 
+import orjson
 from fastapi import (
     APIRouter,
     Depends,
     HTTPException,
     Query,
+    Request,
+    Response,
     WebSocket,
     WebSocketDisconnect,
     status,
 )
-from sqlalchemy import and_, func, or_
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import and_, func, or_, select
 from sqlalchemy.orm import Session
 
-from app.ai_insights import AIInsightModule
+from app.ai_insights import AIInsightModule, get_ai_module
 from app.database import get_db
-from app.models import Analytics, Call
+from app.embedding_index import embedding_index
+from app.models import ANALYTICS_TRIGGERS, Analytics, Call
 from app.schemas import (
-    AgentAnalytics,
     AnalyticsResponse,
     CallDetail,
     CallResponse,
@@ -29,13 +34,24 @@ from app.schemas import (
     CoachingNudge,
     ErrorResponse,
     RecommendationsResponse,
-    SentimentUpdate,
     SimilarCall,
 )
+from app.sentiment_bus import sentiment_bus
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/api/v1")
-ai_module = AIInsightModule()
+
+# Columns serialized by the /calls listing, in CallResponse field order
+CALL_RESPONSE_COLUMNS = [getattr(Call, field) for field in CallResponse.model_fields]
+
+# Seconds clients may reuse an /analytics/agents response before revalidating
+ANALYTICS_MAX_AGE = int(os.getenv("ANALYTICS_CACHE_MAX_AGE", "30"))
+
+
+def get_ai(request: Request) -> AIInsightModule:
+    """Dependency returning the models loaded during application startup."""
+    ai_module = getattr(request.app.state, "ai", None)
+    return ai_module if ai_module is not None else get_ai_module()
 
 
 @router.get("/health")
@@ -49,8 +65,10 @@ async def health_check():
     }
 
 
+# Routes that use the synchronous Session are plain ``def`` so FastAPI runs
+# them in its threadpool instead of blocking the event loop on the database
 @router.get("/calls", response_model=List[CallResponse])
-async def get_calls(
+def get_calls(
     limit: int = Query(10, ge=1, le=100),
     offset: int = Query(0, ge=0),
     agent_id: Optional[str] = Query(None),
@@ -62,7 +80,7 @@ async def get_calls(
 ):
     """Get calls with optional filtering."""
     try:
-        query = db.query(Call)
+        query = select(*CALL_RESPONSE_COLUMNS)
 
         # Apply filters
         filters = []
@@ -78,10 +96,12 @@ async def get_calls(
             filters.append(Call.customer_sentiment_score <= max_sentiment)
 
         if filters:
-            query = query.filter(and_(*filters))
+            query = query.where(and_(*filters))
 
-        calls = query.offset(offset).limit(limit).all()
-        return calls
+        # Return plain rows through orjson instead of validating ORM objects;
+        # response_model still documents the shape
+        rows = db.execute(query.offset(offset).limit(limit)).mappings().all()
+        return ORJSONResponse([dict(row) for row in rows])
 
     except Exception as e:
         logger.error(f"Error fetching calls: {e}")
@@ -92,7 +112,7 @@ async def get_calls(
 
 
 @router.get("/calls/{call_id}", response_model=CallDetail)
-async def get_call_detail(call_id: str, db: Session = Depends(get_db)):
+def get_call_detail(call_id: str, db: Session = Depends(get_db)):
     """Get complete details of one call."""
     try:
         call = db.query(Call).filter(Call.call_id == call_id).first()
@@ -136,7 +156,11 @@ async def get_call_detail(call_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/calls/{call_id}/recommendations", response_model=RecommendationsResponse)
-async def get_call_recommendations(call_id: str, db: Session = Depends(get_db)):
+def get_call_recommendations(
+    call_id: str,
+    request: Request,
+    db: Session = Depends(get_db),
+):
     """Get similar calls and coaching nudges for a specific call."""
     try:
         # Get the target call
@@ -146,44 +170,42 @@ async def get_call_recommendations(call_id: str, db: Session = Depends(get_db)):
                 status_code=status.HTTP_404_NOT_FOUND, detail="Call not found"
             )
 
-        target_embedding = target_call.embedding_list
-        if not target_embedding:
+        target_embedding = target_call.embedding_vector
+        if target_embedding is None:
             raise HTTPException(
                 status_code=status.HTTP_400_BAD_REQUEST,
                 detail="Call embedding not available",
             )
 
-        # Get other calls with embeddings (excluding the target call)
-        other_calls = (
-            db.query(Call)
-            .filter(and_(Call.call_id != call_id, Call.embedding.isnot(None)))
-            .limit(50)
-            .all()
-        )  # Limit for performance
-
-        # Prepare data for similarity calculation
-        call_embeddings = []
-        for call in other_calls:
-            embedding = call.embedding_list
-            if embedding:  # Only include calls with valid embeddings
-                call_embeddings.append(
-                    {
-                        "call_id": call.call_id,
-                        "agent_id": call.agent_id,
-                        "embedding": embedding,
-                        "transcript": call.transcript,
-                    }
-                )
+        # Find similar calls against the cached, pre-normalized embedding matrix
+        embedding_index.refresh_if_stale(db)
+        matches = embedding_index.search(
+            target_embedding, top_k=5, exclude_call_id=call_id
+        )
 
-        # Find similar calls
-        similar_calls_data = ai_module.find_similar_calls(
-            target_embedding, call_embeddings, top_k=5
+        # Only fetch the preview prefix of the transcripts we return
+        previews = dict(
+            db.execute(
+                select(Call.call_id, func.substr(Call.transcript, 1, 200)).where(
+                    Call.call_id.in_([match[0] for match in matches])
+                )
+            ).all()
         )
 
-        similar_calls = [SimilarCall(**call_data) for call_data in similar_calls_data]
+        similar_calls = [
+            SimilarCall(
+                call_id=match_call_id,
+                agent_id=agent_id,
+                similarity_score=similarity_score,
+                transcript_preview=previews[match_call_id] + "...",
+            )
+            for match_call_id, agent_id, similarity_score in matches
+            if match_call_id in previews
+        ]
 
-        # Generate coaching nudges
-        coaching_messages = ai_module.generate_coaching_nudges(
+        # Generate coaching nudges. The models are only resolved once the call
+        # is known to be valid
+        coaching_messages = get_ai(request).generate_coaching_nudges(
             str(getattr(target_call, "transcript", "")),
             float(getattr(target_call, "customer_sentiment_score", 0.0) or 0.0),
             float(getattr(target_call, "agent_talk_ratio", 0.5) or 0.5),
@@ -208,50 +230,45 @@ async def get_call_recommendations(call_id: str, db: Session = Depends(get_db)):
 
 
 @router.get("/analytics/agents", response_model=AnalyticsResponse)
-async def get_agent_analytics(db: Session = Depends(get_db)):
-    """Get agent leaderboard with analytics."""
+def get_agent_analytics(request: Request, db: Session = Depends(get_db)):
+    """Get agent leaderboard with analytics.
+
+    The response carries an ETag and a short ``Cache-Control`` max-age, so
+    clients and proxies can reuse it and revalidate with ``If-None-Match``.
+    """
     try:
-        # Query agent analytics from the analytics table
-        analytics = db.query(Analytics).all()
-
-        # If analytics table is empty, calculate on the fly
-        if not analytics:
-            agent_stats = (
-                db.query(
-                    Call.agent_id,
-                    func.avg(Call.customer_sentiment_score).label("avg_sentiment"),
-                    func.avg(Call.agent_talk_ratio).label("avg_talk_ratio"),
-                    func.count(Call.id).label("total_calls"),
+        # The analytics table is kept current by triggers on calls
+        rows = (
+            db.execute(
+                select(
+                    Analytics.agent_id,
+                    Analytics.avg_sentiment,
+                    Analytics.avg_talk_ratio,
+                    func.coalesce(Analytics.total_calls, 0).label("total_calls"),
                 )
-                .group_by(Call.agent_id)
-                .all()
             )
+            .mappings()
+            .all()
+        )
 
-            agent_analytics = [
-                AgentAnalytics(
-                    agent_id=stat.agent_id,
-                    avg_sentiment=float(stat.avg_sentiment)
-                    if stat.avg_sentiment
-                    else None,
-                    avg_talk_ratio=float(stat.avg_talk_ratio)
-                    if stat.avg_talk_ratio
-                    else None,
-                    total_calls=stat.total_calls,
-                )
-                for stat in agent_stats
-            ]
-        else:
-            agent_analytics = [
-                AgentAnalytics(
-                    agent_id=str(getattr(analytic, "agent_id", "")),
-                    avg_sentiment=getattr(analytic, "avg_sentiment", None),
-                    avg_talk_ratio=getattr(analytic, "avg_talk_ratio", None),
-                    total_calls=int(getattr(analytic, "total_calls", 0)),
+        # Without triggers the table may not be populated yet, so calculate
+        # on the fly. AVG skips calls without a score, as the triggers do
+        if not rows and db.get_bind().dialect.name not in ANALYTICS_TRIGGERS:
+            rows = (
+                db.execute(
+                    select(
+                        Call.agent_id,
+                        func.avg(Call.customer_sentiment_score).label("avg_sentiment"),
+                        func.avg(Call.agent_talk_ratio).label("avg_talk_ratio"),
+                        func.count(Call.id).label("total_calls"),
+                    ).group_by(Call.agent_id)
                 )
-                for analytic in analytics
-            ]
+                .mappings()
+                .all()
+            )
 
-        return AnalyticsResponse(agents=agent_analytics)
+        # Values come straight from the database, so skip re-validation
+        body = orjson.dumps({"agents": [dict(row) for row in rows]})
 
     except Exception as e:
         logger.error(f"Error fetching agent analytics: {e}")
@@ -260,28 +277,43 @@ async def get_agent_analytics(db: Session = Depends(get_db)):
             detail="Error fetching agent analytics",
         )
 
+    headers = {
+        "ETag": f'"{hashlib.blake2b(body, digest_size=16).hexdigest()}"',
+        "Cache-Control": f"public, max-age={ANALYTICS_MAX_AGE}",
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
 
 # WebSocket endpoint for real-time sentiment updates
 @router.websocket("/ws/sentiment/{call_id}")
 async def websocket_sentiment_updates(websocket: WebSocket, call_id: str):
-    """Stream real-time sentiment updates for a call."""
+    """Stream real-time sentiment updates for a call as they are published."""
+    queue = sentiment_bus.subscribe(call_id)
     await websocket.accept()
 
-    try:
-        # Simulate real-time sentiment updates
+    async def forward_updates():
         while True:
-            # Generate random sentiment update (simulate real-time analysis)
-            sentiment_update = SentimentUpdate(
-                call_id=call_id,
-                sentiment_score=random.uniform(-1.0, 1.0),
-                timestamp=datetime.utcnow(),
-            )
+            await websocket.send_text(await queue.get())
 
-            await websocket.send_text(sentiment_update.model_dump_json())
-            await asyncio.sleep(2)  # Send update every 2 seconds
+    sender = asyncio.create_task(forward_updates())
+    try:
+        # Wait on the socket itself so disconnects are noticed between updates
+        while True:
+            await websocket.receive_text()
 
     except WebSocketDisconnect:
         logger.info(f"WebSocket disconnected for call {call_id}")
     except Exception as e:
         logger.error(f"WebSocket error for call {call_id}: {e}")
         await websocket.close()
+    finally:
+        sender.cancel()
+        sentiment_bus.unsubscribe(call_id, queue)
+        # Retrieve the sender's outcome so a failed send is logged, not lost
+        await asyncio.wait([sender])
+        if not sender.cancelled() and sender.exception() is not None:
+            logger.error(
+                f"WebSocket sender error for call {call_id}: {sender.exception()}"
+            )
@@ -1,7 +1,7 @@
 import os
 
 from dotenv import load_dotenv
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
 
@@ -9,6 +9,18 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./data/sales_analytics.db")
 
+
+def set_sqlite_pragmas(dbapi_connection, connection_record):
+    """Use WAL so readers don't block behind writers, and cache more pages."""
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+    cursor.execute("PRAGMA cache_size=-65536")  # 64 MB
+    cursor.execute("PRAGMA temp_store=MEMORY")
+    cursor.close()
+
+
 # SQLite-specific configuration
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(
@@ -16,9 +28,21 @@ if DATABASE_URL.startswith("sqlite"):
         connect_args={
             "check_same_thread": False
         },  # Allow SQLite to be used with multiple threads
+        query_cache_size=1200,
     )
+    event.listen(engine, "connect", set_sqlite_pragmas)
+
 else:
-    engine = create_engine(DATABASE_URL)
+    # LIFO checkout keeps a small set of warm connections busy and lets
+    # overflow connections go idle and close sooner
+    engine = create_engine(
+        DATABASE_URL,
+        query_cache_size=1200,
+        pool_pre_ping=True,
+        pool_use_lifo=True,
+        pool_size=20,
+        max_overflow=10,
+    )
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
@@ -0,0 +1,226 @@
+import logging
+import os
+import threading
+import time
+from datetime import timedelta
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+
+from app import sim_kernels
+from app.models import Call
+
+try:
+    import faiss
+except ImportError:  # pragma: no cover - faiss is optional
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+EPS = 1e-12
+
+# Switch from brute force to an HNSW graph once the index is this large
+ANN_MIN_ROWS = int(os.getenv("EMBEDDING_ANN_MIN_ROWS", "10000"))
+HNSW_NEIGHBORS = 32
+HNSW_EF_SEARCH = 64
+
+# Seconds between checks of the calls table from refresh_if_stale
+REFRESH_INTERVAL = float(os.getenv("EMBEDDING_INDEX_REFRESH_SECONDS", "30"))
+
+
+class EmbeddingIndex:
+    """In-memory matrix of L2-normalized call embeddings.
+
+    Rows are kept in a contiguous float32 buffer so a similarity search is a
+    single matrix-vector product. The index tracks a cheap fingerprint of the
+    ``calls`` table and only reloads rows that changed since the last refresh.
+    Request handlers call ``refresh_if_stale``, which checks the table at most
+    once every ``REFRESH_INTERVAL`` seconds.
+    When faiss is installed and the index holds at least ``ANN_MIN_ROWS``
+    rows, searches go through an HNSW graph over int8-quantized vectors
+    instead of a full scan.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.ids: List[str] = []
+        self.agent_ids: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self._buffer = np.empty((0, 0), dtype=np.float32)
+        self._fingerprint: Optional[Tuple] = None
+        self._ann = None
+        self._ann_rows = 0
+        self._refreshed_at: Optional[float] = None
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """View of the populated rows of the normalized embedding matrix."""
+        return self._buffer[: len(self.ids)]
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def clear(self) -> None:
+        with self.lock:
+            self.ids = []
+            self.agent_ids = []
+            self._positions = {}
+            self._buffer = np.empty((0, 0), dtype=np.float32)
+            self._fingerprint = None
+            self._ann = None
+            self._ann_rows = 0
+            self._refreshed_at = None
+
+    def add(self, call_id: str, agent_id: str, embedding) -> None:
+        """Insert or replace one call, normalizing only that row."""
+        vector = np.asarray(embedding, dtype=np.float32)
+        if vector.ndim != 1 or vector.size == 0:
+            return
+        normalized = vector / (np.linalg.norm(vector) + EPS)
+
+        with self.lock:
+            if not self.ids:
+                self._buffer = np.empty((16, vector.size), dtype=np.float32)
+            elif vector.size != self._buffer.shape[1]:
+                logger.warning(
+                    f"Skipping embedding for call {call_id}: expected dimension "
+                    f"{self._buffer.shape[1]}, got {vector.size}"
+                )
+                return
+
+            position = self._positions.get(call_id)
+            if position is None:
+                position = len(self.ids)
+                if position == self._buffer.shape[0]:
+                    # Grow geometrically so appends stay amortized O(1)
+                    grown = np.empty(
+                        (position * 2, self._buffer.shape[1]), dtype=np.float32
+                    )
+                    grown[:position] = self._buffer[:position]
+                    self._buffer = grown
+                self.ids.append(call_id)
+                self.agent_ids.append(agent_id)
+                self._positions[call_id] = position
+            else:
+                self.agent_ids[position] = agent_id
+                # Refreshes reload rows at the previous max(updated_at), so
+                # most replacements carry the vector already stored
+                if np.array_equal(self._buffer[position], normalized):
+                    return
+                # HNSW graphs can't update vectors in place
+                self._ann = None
+
+            self._buffer[position] = normalized
+
+    def _ann_index(self):
+        """Return an HNSW index covering every row, or None to brute force."""
+        if faiss is None or len(self) < ANN_MIN_ROWS:
+            return None
+
+        if self._ann is None:
+            # The graph stores int8 codes rather than a second float32 copy of
+            # the buffer, quartering its memory and the bytes each search reads.
+            # Per-dimension ranges are trained on the rows present at build time
+            self._ann = faiss.IndexHNSWSQ(
+                self._buffer.shape[1],
+                faiss.ScalarQuantizer.QT_8bit,
+                HNSW_NEIGHBORS,
+                faiss.METRIC_INNER_PRODUCT,
+            )
+            self._ann.hnsw.efSearch = HNSW_EF_SEARCH
+            self._ann.train(self.matrix)
+            self._ann_rows = 0
+
+        if self._ann_rows < len(self):
+            # Rows are append-only, so only the tail needs to be added
+            self._ann.add(self._buffer[self._ann_rows : len(self)])
+            self._ann_rows = len(self)
+
+        return self._ann
+
+    def _load(self, rows) -> None:
+        for call_id, agent_id, embedding in rows:
+            self.add(call_id, agent_id, np.frombuffer(embedding, dtype=np.float32))
+
+    def refresh_if_stale(self, db: Session) -> None:
+        """Refresh unless the calls table was checked within REFRESH_INTERVAL."""
+        refreshed_at = self._refreshed_at
+        if refreshed_at is None or time.monotonic() - refreshed_at >= REFRESH_INTERVAL:
+            self.refresh(db)
+
+    def refresh(self, db: Session) -> None:
+        """Bring the index in line with the calls table."""
+        count, latest = (
+            db.query(func.count(Call.id), func.max(Call.updated_at))
+            .filter(Call.embedding.isnot(None))
+            .one()
+        )
+        fingerprint = (count, latest)
+
+        with self.lock:
+            if fingerprint == self._fingerprint:
+                self._refreshed_at = time.monotonic()
+                return
+
+            query = db.query(Call.call_id, Call.agent_id, Call.embedding).filter(
+                Call.embedding.isnot(None)
+            )
+            previous = self._fingerprint
+            if previous is not None and previous[1] is not None:
+                # Only pick up rows written since the last refresh. SQLite
+                # stores second-precision timestamps as text, which compares
+                # below the bound parameter's microsecond form, so reach back
+                # a second; add() skips the unchanged rows this re-reads
+                self._load(
+                    query.filter(Call.updated_at >= previous[1] - timedelta(seconds=1))
+                )
+
+            if len(self) != count:
+                # First load, or rows were deleted: rebuild from scratch
+                self.clear()
+                self._load(query)
+
+            self._fingerprint = fingerprint
+            self._refreshed_at = time.monotonic()
+
+    def search(
+        self, target, top_k: int = 5, exclude_call_id: Optional[str] = None
+    ) -> List[Tuple[str, str, float]]:
+        """Return ``(call_id, agent_id, similarity)`` for the top k matches."""
+        target = np.asarray(target, dtype=np.float32)
+
+        with self.lock:
+            if not self.ids or top_k <= 0 or target.size != self._buffer.shape[1]:
+                return []
+
+            target = target / (np.linalg.norm(target) + EPS)
+            excluded = self._positions.get(exclude_call_id) if exclude_call_id else None
+
+            ann = self._ann_index()
+            if ann is not None:
+                # Ask for one extra neighbour in case the query call comes back
+                scores, indices = ann.search(target[None, :], top_k + 1)
+                return [
+                    (self.ids[i], self.agent_ids[i], float(score))
+                    for score, i in zip(scores[0], indices[0])
+                    if i >= 0 and i != excluded
+                ][:top_k]
+
+            similarities = self.matrix @ target
+            if excluded is not None:
+                similarities[excluded] = -np.inf
+
+            available = similarities.size - (excluded is not None)
+            top_indices = sim_kernels.top_k_indices(
+                similarities, min(top_k, available)
+            )
+
+            return [
+                (self.ids[i], self.agent_ids[i], float(similarities[i]))
+                for i in top_indices
+            ]
+
+
+embedding_index = EmbeddingIndex()
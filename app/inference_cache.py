@@ -0,0 +1,119 @@
+import hashlib
+import re
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Set
+
+_token_re = re.compile(r"\w+")
+
+SIMHASH_BITS = 64
+SIMHASH_BANDS = 4
+SHINGLE_SIZE = 3
+
+
+def content_key(text: str) -> bytes:
+    """Stable 16-byte digest identifying an exact text."""
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+def simhash(text: str) -> int:
+    """64-bit SimHash over lower-cased word shingles."""
+    tokens = _token_re.findall(text.lower())
+    shingles = [
+        " ".join(tokens[i : i + SHINGLE_SIZE])
+        for i in range(max(1, len(tokens) - SHINGLE_SIZE + 1))
+    ]
+
+    weights = [0] * SIMHASH_BITS
+    for shingle in shingles:
+        value = int.from_bytes(
+            hashlib.blake2b(shingle.encode("utf-8"), digest_size=8).digest(), "big"
+        )
+        for bit in range(SIMHASH_BITS):
+            weights[bit] += 1 if value >> bit & 1 else -1
+
+    return sum(1 << bit for bit, weight in enumerate(weights) if weight > 0)
+
+
+class InferenceCache:
+    """Bounded LRU cache of model outputs keyed by transcript content.
+
+    Exact repeats are found by content hash. With ``near_duplicates`` enabled,
+    a miss falls back to SimHash: any cached text within ``max_distance`` bits
+    is treated as the same input. SimHashes are split into bands so only
+    entries sharing a band are compared.
+    """
+
+    def __init__(
+        self, maxsize: int = 4096, near_duplicates: bool = False, max_distance: int = 3
+    ):
+        self.maxsize = maxsize
+        self.near_duplicates = near_duplicates
+        self.max_distance = max_distance
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[bytes, Any]" = OrderedDict()
+        self._simhashes: Dict[bytes, int] = {}
+        self._bands: Dict[tuple, Set[bytes]] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _band_keys(self, fingerprint: int):
+        width = SIMHASH_BITS // SIMHASH_BANDS
+        mask = (1 << width) - 1
+        return [
+            (band, fingerprint >> (band * width) & mask)
+            for band in range(SIMHASH_BANDS)
+        ]
+
+    def get(self, text: str) -> Optional[Any]:
+        key = content_key(text)
+        with self._lock:
+            if key in self._entries:
+                self._entries.move_to_end(key)
+                return self._entries[key]
+
+            if not self.near_duplicates:
+                return None
+
+            fingerprint = simhash(text)
+            for band_key in self._band_keys(fingerprint):
+                for candidate in self._bands.get(band_key, ()):
+                    distance = bin(self._simhashes[candidate] ^ fingerprint).count("1")
+                    if distance <= self.max_distance:
+                        self._entries.move_to_end(candidate)
+                        return self._entries[candidate]
+            return None
+
+    def put(self, text: str, value: Any) -> None:
+        key = content_key(text)
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+
+            if self.near_duplicates and key not in self._simhashes:
+                fingerprint = simhash(text)
+                self._simhashes[key] = fingerprint
+                for band_key in self._band_keys(fingerprint):
+                    self._bands.setdefault(band_key, set()).add(key)
+
+            while len(self._entries) > self.maxsize:
+                evicted, _ = self._entries.popitem(last=False)
+                self._forget(evicted)
+
+    def _forget(self, key: bytes) -> None:
+        fingerprint = self._simhashes.pop(key, None)
+        if fingerprint is None:
+            return
+        for band_key in self._band_keys(fingerprint):
+            members = self._bands.get(band_key)
+            if members is not None:
+                members.discard(key)
+                if not members:
+                    del self._bands[band_key]
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self._simhashes.clear()
+            self._bands.clear()
@@ -1,12 +1,18 @@
+import asyncio
 import logging
+import os
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
+from app.ai_insights import get_ai_module
 from app.api import router
-from app.database import engine
+from app.database import SessionLocal, engine
+from app.embedding_index import embedding_index
 from app.models import Base
+from app.sentiment_bus import watch_sentiments
 
 # Configure logging
 logging.basicConfig(
@@ -14,6 +20,11 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Load the models at import time so gunicorn --preload shares the weights
+# copy-on-write across forked workers instead of loading them per worker
+if os.getenv("PRELOAD_MODELS", "false").lower() == "true":
+    get_ai_module()
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -28,10 +39,26 @@ async def lifespan(app: FastAPI):
         logger.error(f"Error creating database tables: {e}")
         raise
 
+    # Load the models once per process and share them across requests
+    app.state.ai = get_ai_module()
+
+    # Warm the in-memory embedding index used for recommendations
+    try:
+        with SessionLocal() as db:
+            embedding_index.refresh(db)
+        logger.info(f"Loaded {len(embedding_index)} call embeddings into memory")
+    except Exception as e:
+        logger.warning(f"Failed to load embedding index: {e}")
+
+    # Push sentiment scores written by ingestion or re-scoring to websockets
+    sentiment_watcher = asyncio.create_task(watch_sentiments(SessionLocal))
+
     yield
 
     # Shutdown
     logger.info("Shutting down Sales Call Analytics API...")
+    sentiment_watcher.cancel()
+    await asyncio.wait([sentiment_watcher])
 
 
 app = FastAPI(
@@ -39,15 +66,17 @@ app = FastAPI(
     description="A microservice for ingesting and analyzing sales call transcripts",
     version="1.0.0",
     lifespan=lifespan,
+    default_response_class=ORJSONResponse,
 )
 
-# Add CORS middleware
+# Add CORS middleware. Fixed lists let Starlette build the preflight
+# headers once instead of echoing request values on every request
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["*"],  # Configure appropriately for production
+    allow_origins=os.getenv("CORS_ORIGINS", "*").split(","),
     allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
+    allow_methods=["GET"],  # The API is read-only
+    allow_headers=["Authorization", "Content-Type"],
 )
 
 # Include API routes
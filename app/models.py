@@ -1,8 +1,20 @@
-import json
 import uuid
 from datetime import datetime
 
-from sqlalchemy import Column, DateTime, Float, Integer, String, Text
+import numpy as np
+from sqlalchemy import (
+    DDL,
+    Column,
+    DateTime,
+    Float,
+    Index,
+    Integer,
+    LargeBinary,
+    String,
+    Text,
+    event,
+    func,
+)
 from sqlalchemy.ext.hybrid import hybrid_property
 
 from app.database import Base
@@ -10,10 +22,15 @@ from app.database import Base
 
 class Call(Base):
     __tablename__ = "calls"
+    __table_args__ = (
+        # Composite indexes covering the /calls filter combinations
+        Index("ix_calls_agent_start", "agent_id", "start_time"),
+        Index("ix_calls_sentiment_agent", "customer_sentiment_score", "agent_id"),
+    )
 
     id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
     call_id = Column(String, unique=True, nullable=False, index=True)
-    agent_id = Column(String, nullable=False, index=True)
+    agent_id = Column(String, nullable=False)
     customer_id = Column(String, nullable=False)
     language = Column(String, nullable=False, default="en")
     start_time = Column(DateTime, nullable=False, index=True)
@@ -23,32 +40,38 @@ class Call(Base):
     # AI insights
     agent_talk_ratio = Column(Float)
     customer_sentiment_score = Column(Float)
-    embedding = Column(Text)  # Store as JSON string for SQLite compatibility
+    embedding = Column(LargeBinary)  # Packed float32 vector
 
-    created_at = Column(DateTime, default=datetime.utcnow)
-    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    # Both timestamps come from the database clock, so max(updated_at), which
+    # the embedding index uses to detect changed rows, compares like with like
+    created_at = Column(DateTime, server_default=func.now())
+    updated_at = Column(DateTime, server_default=func.now(), onupdate=func.now())
 
     @hybrid_property
     def duration_minutes(self):
         return self.duration_seconds / 60.0
 
+    @property
+    def embedding_vector(self):
+        """Decode the packed embedding into a float32 array without copying."""
+        if self.embedding:
+            return np.frombuffer(self.embedding, dtype=np.float32)
+        return None
+
     @property
     def embedding_list(self):
-        """Convert embedding JSON string to list of floats."""
-        embedding_value = getattr(self, "_embedding", None) or self.embedding
-        if embedding_value:
-            try:
-                return json.loads(str(embedding_value))
-            except (json.JSONDecodeError, TypeError):
-                return None
+        """Convert embedding bytes to list of floats."""
+        embedding_vector = self.embedding_vector
+        if embedding_vector is not None:
+            return embedding_vector.tolist()
         return None
 
     def set_embedding(self, embedding_list):
         """Set embedding from list of floats."""
-        if embedding_list:
-            object.__setattr__(self, "embedding", json.dumps(embedding_list))
+        if embedding_list is not None and len(embedding_list) > 0:
+            self.embedding = np.asarray(embedding_list, dtype=np.float32).tobytes()
         else:
-            object.__setattr__(self, "embedding", None)
+            self.embedding = None
 
 
 class Analytics(Base):
@@ -59,4 +82,106 @@ class Analytics(Base):
     avg_sentiment = Column(Float)
     avg_talk_ratio = Column(Float)
     total_calls = Column(Integer, default=0)
+    # Running totals maintained by the calls triggers below. Averages divide
+    # by the scored counts, so calls without a score don't pull them to 0
+    sum_sentiment = Column(Float, default=0.0)
+    sum_talk_ratio = Column(Float, default=0.0)
+    scored_sentiment_calls = Column(Integer, default=0)
+    scored_talk_calls = Column(Integer, default=0)
     last_updated = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# Triggers that keep the analytics table in step with calls, so reads never
+# aggregate over the calls table. Averages cover only the calls that have a
+# score and stay NULL until one does. Other dialects fall back to aggregating
+# calls on read.
+_ADD_CALL_SQL = """
+    INSERT INTO analytics (
+        id, agent_id, sum_sentiment, sum_talk_ratio, scored_sentiment_calls,
+        scored_talk_calls, total_calls, avg_sentiment, avg_talk_ratio,
+        last_updated
+    )
+    VALUES (
+        {new_id}, NEW.agent_id,
+        COALESCE(NEW.customer_sentiment_score, 0.0),
+        COALESCE(NEW.agent_talk_ratio, 0.0),
+        CASE WHEN NEW.customer_sentiment_score IS NULL THEN 0 ELSE 1 END,
+        CASE WHEN NEW.agent_talk_ratio IS NULL THEN 0 ELSE 1 END, 1,
+        NEW.customer_sentiment_score, NEW.agent_talk_ratio, CURRENT_TIMESTAMP
+    )
+    ON CONFLICT (agent_id) DO UPDATE SET
+        sum_sentiment = COALESCE(analytics.sum_sentiment, 0.0)
+            + excluded.sum_sentiment,
+        sum_talk_ratio = COALESCE(analytics.sum_talk_ratio, 0.0)
+            + excluded.sum_talk_ratio,
+        scored_sentiment_calls = COALESCE(analytics.scored_sentiment_calls, 0)
+            + excluded.scored_sentiment_calls,
+        scored_talk_calls = COALESCE(analytics.scored_talk_calls, 0)
+            + excluded.scored_talk_calls,
+        total_calls = COALESCE(analytics.total_calls, 0) + 1,
+        avg_sentiment = (COALESCE(analytics.sum_sentiment, 0.0)
+            + excluded.sum_sentiment) / NULLIF(
+                COALESCE(analytics.scored_sentiment_calls, 0)
+                + excluded.scored_sentiment_calls, 0),
+        avg_talk_ratio = (COALESCE(analytics.sum_talk_ratio, 0.0)
+            + excluded.sum_talk_ratio) / NULLIF(
+                COALESCE(analytics.scored_talk_calls, 0)
+                + excluded.scored_talk_calls, 0),
+        last_updated = CURRENT_TIMESTAMP;
+"""
+
+_REMOVE_CALL_SQL = """
+    UPDATE analytics SET
+        sum_sentiment = COALESCE(sum_sentiment, 0.0)
+            - COALESCE(OLD.customer_sentiment_score, 0.0),
+        sum_talk_ratio = COALESCE(sum_talk_ratio, 0.0)
+            - COALESCE(OLD.agent_talk_ratio, 0.0),
+        scored_sentiment_calls = COALESCE(scored_sentiment_calls, 0)
+            - CASE WHEN OLD.customer_sentiment_score IS NULL THEN 0 ELSE 1 END,
+        scored_talk_calls = COALESCE(scored_talk_calls, 0)
+            - CASE WHEN OLD.agent_talk_ratio IS NULL THEN 0 ELSE 1 END,
+        total_calls = total_calls - 1,
+        avg_sentiment = (COALESCE(sum_sentiment, 0.0)
+            - COALESCE(OLD.customer_sentiment_score, 0.0)) / NULLIF(
+                COALESCE(scored_sentiment_calls, 0)
+                - CASE WHEN OLD.customer_sentiment_score IS NULL THEN 0 ELSE 1 END,
+                0),
+        avg_talk_ratio = (COALESCE(sum_talk_ratio, 0.0)
+            - COALESCE(OLD.agent_talk_ratio, 0.0)) / NULLIF(
+                COALESCE(scored_talk_calls, 0)
+                - CASE WHEN OLD.agent_talk_ratio IS NULL THEN 0 ELSE 1 END,
+                0),
+        last_updated = CURRENT_TIMESTAMP
+    WHERE agent_id = OLD.agent_id;
+    DELETE FROM analytics WHERE agent_id = OLD.agent_id AND total_calls <= 0;
+"""
+
+_SQLITE_ADD_CALL_SQL = _ADD_CALL_SQL.format(new_id="lower(hex(randomblob(16)))")
+_POSTGRES_ADD_CALL_SQL = _ADD_CALL_SQL.format(new_id="CAST(gen_random_uuid() AS TEXT)")
+
+ANALYTICS_TRIGGERS = {
+    "sqlite": [
+        "CREATE TRIGGER IF NOT EXISTS calls_analytics_ai AFTER INSERT ON calls "
+        f"BEGIN {_SQLITE_ADD_CALL_SQL} END",
+        "CREATE TRIGGER IF NOT EXISTS calls_analytics_ad AFTER DELETE ON calls "
+        f"BEGIN {_REMOVE_CALL_SQL} END",
+        "CREATE TRIGGER IF NOT EXISTS calls_analytics_au AFTER UPDATE OF "
+        "agent_id, customer_sentiment_score, agent_talk_ratio ON calls "
+        f"BEGIN {_REMOVE_CALL_SQL} {_SQLITE_ADD_CALL_SQL} END",
+    ],
+    "postgresql": [
+        "CREATE OR REPLACE FUNCTION calls_analytics_sync() RETURNS trigger AS $$ "
+        f"BEGIN IF TG_OP <> 'INSERT' THEN {_REMOVE_CALL_SQL} END IF; "
+        f"IF TG_OP <> 'DELETE' THEN {_POSTGRES_ADD_CALL_SQL} END IF; "
+        "RETURN NULL; END; $$ LANGUAGE plpgsql",
+        "CREATE TRIGGER calls_analytics AFTER INSERT OR DELETE OR UPDATE OF "
+        "agent_id, customer_sentiment_score, agent_talk_ratio ON calls "
+        "FOR EACH ROW EXECUTE FUNCTION calls_analytics_sync()",
+    ],
+}
+
+for _dialect, _triggers in ANALYTICS_TRIGGERS.items():
+    for _trigger in _triggers:
+        event.listen(
+            Call.__table__, "after_create", DDL(_trigger).execute_if(dialect=_dialect)
+        )
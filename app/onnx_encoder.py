@@ -0,0 +1,81 @@
+import os
+from typing import List
+
+import numpy as np
+from transformers import AutoTokenizer
+
+try:
+    import onnxruntime as ort
+except ImportError:  # pragma: no cover - onnxruntime is optional
+    ort = None
+
+# Matches the max_seq_length sentence-transformers uses for all-MiniLM-L6-v2
+MAX_SEQ_LENGTH = 256
+
+
+class OnnxSentenceEncoder:
+    """Sentence embeddings from an ONNX export of a sentence-transformers model.
+
+    ``model_dir`` is the output of ``optimum-cli export onnx --task
+    feature-extraction``: a tokenizer plus ``model.onnx``. Mean pooling and
+    L2 normalization run in NumPy on the last hidden state. ``encode`` mirrors
+    the subset of ``SentenceTransformer.encode`` used by AIInsightModule.
+    """
+
+    def __init__(self, model_dir: str, max_seq_length: int = MAX_SEQ_LENGTH):
+        if ort is None:
+            raise ImportError("onnxruntime is required for the ONNX embedding backend")
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        options.intra_op_num_threads = os.cpu_count() or 1
+
+        self.tokenizer = AutoTokenizer.from_pretrained(model_dir)
+        self.session = ort.InferenceSession(
+            os.path.join(model_dir, "model.onnx"),
+            sess_options=options,
+            providers=["CPUExecutionProvider"],
+        )
+        self.input_names = {
+            model_input.name for model_input in self.session.get_inputs()
+        }
+        self.max_seq_length = max_seq_length
+
+    def encode(
+        self,
+        texts: List[str],
+        batch_size: int = 32,
+        convert_to_numpy: bool = True,
+        normalize_embeddings: bool = False,
+    ) -> np.ndarray:
+        batches = [
+            self._encode_batch(texts[start : start + batch_size], normalize_embeddings)
+            for start in range(0, len(texts), batch_size)
+        ]
+        return np.concatenate(batches) if batches else np.empty((0, 0), np.float32)
+
+    def _encode_batch(self, texts: List[str], normalize: bool) -> np.ndarray:
+        encoded = self.tokenizer(
+            texts,
+            padding=True,
+            truncation=True,
+            max_length=self.max_seq_length,
+            return_tensors="np",
+        )
+        inputs = {
+            name: value.astype(np.int64)
+            for name, value in encoded.items()
+            if name in self.input_names
+        }
+        hidden_state = self.session.run(None, inputs)[0]
+
+        # Mean-pool over real tokens only
+        mask = encoded["attention_mask"][..., None].astype(np.float32)
+        embeddings = (hidden_state * mask).sum(axis=1) / np.clip(
+            mask.sum(axis=1), 1e-9, None
+        )
+        if normalize:
+            embeddings /= np.clip(
+                np.linalg.norm(embeddings, axis=1, keepdims=True), 1e-12, None
+            )
+        return embeddings.astype(np.float32)
@@ -0,0 +1,162 @@
+import asyncio
+import logging
+import os
+import threading
+from datetime import datetime
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+import orjson
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from app.models import Call
+from app.schemas import SentimentUpdate
+
+logger = logging.getLogger(__name__)
+
+# Updates buffered per subscriber before the oldest ones are dropped
+QUEUE_SIZE = 64
+
+# Seconds between checks of the subscribed calls for new sentiment scores
+POLL_INTERVAL = float(os.getenv("SENTIMENT_POLL_SECONDS", "2"))
+
+
+class SentimentBus:
+    """Fan out sentiment updates to the websocket subscribers of each call.
+
+    Every subscriber gets a bounded ``asyncio.Queue`` on its own event loop.
+    ``publish`` is safe to call from any thread: the update is serialized once
+    and handed to each subscriber's loop. A slow consumer whose queue is full
+    loses its oldest update, since only the latest sentiment matters. New
+    subscribers start with the last update published for their call.
+    """
+
+    def __init__(self, queue_size: int = QUEUE_SIZE):
+        self.queue_size = queue_size
+        self._lock = threading.Lock()
+        self._subscribers: Dict[
+            str, Set[Tuple[asyncio.AbstractEventLoop, asyncio.Queue]]
+        ] = {}
+        self._latest: Dict[str, str] = {}
+
+    def subscribe(self, call_id: str) -> asyncio.Queue:
+        """Register a queue for ``call_id`` on the running event loop."""
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        with self._lock:
+            self._subscribers.setdefault(call_id, set()).add(
+                (asyncio.get_running_loop(), queue)
+            )
+            latest = self._latest.get(call_id)
+        if latest is not None:
+            queue.put_nowait(latest)
+        return queue
+
+    def unsubscribe(self, call_id: str, queue: asyncio.Queue) -> None:
+        with self._lock:
+            subscribers = self._subscribers.get(call_id)
+            if subscribers is None:
+                return
+            subscribers.difference_update(
+                {entry for entry in subscribers if entry[1] is queue}
+            )
+            if not subscribers:
+                del self._subscribers[call_id]
+                self._latest.pop(call_id, None)
+
+    def subscriber_count(self, call_id: str) -> int:
+        with self._lock:
+            return len(self._subscribers.get(call_id, ()))
+
+    def subscribed_call_ids(self) -> List[str]:
+        with self._lock:
+            return list(self._subscribers)
+
+    def publish(self, update: SentimentUpdate) -> None:
+        """Deliver ``update`` to every subscriber of its call without blocking."""
+        with self._lock:
+            subscribers = list(self._subscribers.get(update.call_id, ()))
+        if not subscribers:
+            return
+
+        # Sent as a text frame so browser clients can JSON.parse it directly
+        message = orjson.dumps(
+            update.model_dump(),
+            option=orjson.OPT_NAIVE_UTC | orjson.OPT_SERIALIZE_NUMPY,
+        ).decode()
+        with self._lock:
+            if update.call_id in self._subscribers:
+                self._latest[update.call_id] = message
+        for loop, queue in subscribers:
+            try:
+                loop.call_soon_threadsafe(self._offer, queue, message)
+            except RuntimeError:
+                # The subscriber's loop has already shut down
+                self.unsubscribe(update.call_id, queue)
+
+    @staticmethod
+    def _offer(queue: asyncio.Queue, message: str) -> None:
+        if queue.full():
+            queue.get_nowait()
+        queue.put_nowait(message)
+
+
+sentiment_bus = SentimentBus()
+
+
+def publish_changed_sentiments(
+    db: Session, bus: SentimentBus, published: Dict[str, Tuple]
+) -> int:
+    """Publish subscribed calls whose score changed since it was last published.
+
+    Calls are scored by the ingest script and Celery workers in other
+    processes, so the database is the only place their updates meet.
+    ``published`` maps call IDs to the ``(score, updated_at)`` last sent and
+    is updated in place. Returns the number of updates published.
+    """
+    call_ids = bus.subscribed_call_ids()
+    for call_id in set(published).difference(call_ids):
+        del published[call_id]
+    if not call_ids:
+        return 0
+
+    rows = db.execute(
+        select(Call.call_id, Call.customer_sentiment_score, Call.updated_at).where(
+            Call.call_id.in_(call_ids), Call.customer_sentiment_score.isnot(None)
+        )
+    ).all()
+    count = 0
+    for call_id, score, updated_at in rows:
+        if published.get(call_id) == (score, updated_at):
+            continue
+        published[call_id] = (score, updated_at)
+        bus.publish(
+            SentimentUpdate(
+                call_id=call_id,
+                sentiment_score=score,
+                timestamp=updated_at or datetime.utcnow(),
+            )
+        )
+        count += 1
+    return count
+
+
+async def watch_sentiments(
+    session_factory: Callable[[], Session],
+    bus: SentimentBus = sentiment_bus,
+    interval: Optional[float] = None,
+) -> None:
+    """Poll the subscribed calls and publish new scores until cancelled."""
+    published: Dict[str, Tuple] = {}
+
+    def poll() -> int:
+        with session_factory() as db:
+            return publish_changed_sentiments(db, bus, published)
+
+    while True:
+        try:
+            # Skip the database entirely while nobody is listening
+            if bus.subscribed_call_ids() or published:
+                await asyncio.to_thread(poll)
+        except Exception as e:
+            logger.error(f"Error polling sentiment updates: {e}")
+        await asyncio.sleep(POLL_INTERVAL if interval is None else interval)
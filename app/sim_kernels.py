@@ -0,0 +1,61 @@
+import numpy as np
+
+try:
+    from numba import njit, prange
+except ImportError:  # pragma: no cover - numba is optional
+    njit = None
+
+EPS = 1e-12
+
+
+def _cosine_scores_numpy(matrix: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Score rows of ``matrix`` against a normalized target with NumPy."""
+    norms = np.linalg.norm(matrix, axis=1)
+    return (matrix @ target) / (norms + EPS)
+
+
+if njit is not None:
+
+    @njit(parallel=True, fastmath=True, cache=True)
+    def _cosine_scores_numba(matrix, target, out):  # pragma: no cover - jitted
+        # Fuse the row norm and the dot product into one pass over each row
+        for i in prange(matrix.shape[0]):
+            dot = 0.0
+            norm = 0.0
+            for j in range(matrix.shape[1]):
+                value = matrix[i, j]
+                dot += value * target[j]
+                norm += value * value
+            out[i] = dot / (np.sqrt(norm) + EPS)
+
+
+def cosine_scores(matrix: np.ndarray, target: np.ndarray) -> np.ndarray:
+    """Cosine similarity of every row of ``matrix`` against ``target``.
+
+    ``matrix`` is an (N, D) float32 array and ``target`` must already be
+    L2-normalized, so only the row norms are computed here.
+    """
+    if njit is None:
+        return _cosine_scores_numpy(matrix, target)
+
+    out = np.empty(matrix.shape[0], dtype=np.float32)
+    _cosine_scores_numba(
+        np.ascontiguousarray(matrix, dtype=np.float32),
+        np.ascontiguousarray(target, dtype=np.float32),
+        out,
+    )
+    return out
+
+
+def top_k_indices(scores: np.ndarray, top_k: int) -> np.ndarray:
+    """Indices of the ``top_k`` highest scores, best first.
+
+    Uses an O(N) partition and only sorts the selected entries.
+    """
+    top_k = min(top_k, scores.size)
+    if top_k <= 0:
+        return np.empty(0, dtype=np.intp)
+
+    top_indices = np.argpartition(-scores, top_k - 1)[:top_k]
+    return top_indices[np.argsort(-scores[top_indices])]
+
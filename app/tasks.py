@@ -4,10 +4,11 @@ from datetime import datetime
 
 from celery import Celery
 from dotenv import load_dotenv
-from sqlalchemy import create_engine, func
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import delete, select
 
-from app.models import Analytics, Call
+from app.analytics import upsert_agent_analytics
+from app.database import SessionLocal
+from app.models import Call
 
 load_dotenv()
 
@@ -15,25 +16,15 @@ load_dotenv()
 redis_url = os.getenv("REDIS_URL", "redis://localhost:6379")
 celery_app = Celery("sales_analytics", broker=redis_url, backend=redis_url)
 
-# Database setup - use the same configuration as the main app
-database_url = os.getenv("DATABASE_URL", "sqlite:///./data/sales_analytics.db")
-
-# SQLite-specific configuration
-if database_url.startswith("sqlite"):
-    engine = create_engine(
-        database_url,
-        connect_args={
-            "check_same_thread": False
-        },  # Allow SQLite to be used with multiple threads
-    )
-else:
-    engine = create_engine(database_url)
-
-SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+# Tasks open sessions from app.database's SessionLocal, so a worker that
+# shares a process with the API also shares its engine and connection pool
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Rows removed per transaction by cleanup_old_calls
+CLEANUP_BATCH_SIZE = 10000
+
 
 @celery_app.task
 def recalculate_analytics():
@@ -42,57 +33,7 @@ def recalculate_analytics():
 
     db = SessionLocal()
     try:
-        # Get all agents
-        agents = db.query(Call.agent_id).distinct().all()
-        updated_count = 0
-
-        for (agent_id,) in agents:
-            # Calculate aggregated metrics for this agent
-            calls = db.query(Call).filter(Call.agent_id == agent_id).all()
-
-            if calls:
-                # Calculate averages
-                sentiment_scores = [
-                    call.customer_sentiment_score
-                    for call in calls
-                    if call.customer_sentiment_score is not None
-                ]
-                talk_ratios = [
-                    call.agent_talk_ratio
-                    for call in calls
-                    if call.agent_talk_ratio is not None
-                ]
-
-                avg_sentiment = (
-                    sum(sentiment_scores) / len(sentiment_scores)
-                    if sentiment_scores
-                    else None
-                )
-                avg_talk_ratio = (
-                    sum(talk_ratios) / len(talk_ratios) if talk_ratios else None
-                )
-                total_calls = len(calls)
-
-                # Update or create analytics record
-                analytics = (
-                    db.query(Analytics).filter(Analytics.agent_id == agent_id).first()
-                )
-
-                if analytics:
-                    object.__setattr__(analytics, "avg_sentiment", avg_sentiment)
-                    object.__setattr__(analytics, "avg_talk_ratio", avg_talk_ratio)
-                    object.__setattr__(analytics, "total_calls", total_calls)
-                    object.__setattr__(analytics, "last_updated", datetime.utcnow())
-                else:
-                    analytics = Analytics(
-                        agent_id=agent_id,
-                        avg_sentiment=avg_sentiment,
-                        avg_talk_ratio=avg_talk_ratio,
-                        total_calls=total_calls,
-                    )
-                    db.add(analytics)
-
-                updated_count += 1
+        updated_count = upsert_agent_analytics(db)
 
         db.commit()
         logger.info(
@@ -119,9 +60,25 @@ def cleanup_old_calls(days_to_keep: int = 90):
 
         cutoff_date = datetime.utcnow() - timedelta(days=days_to_keep)
 
-        # Delete old calls
-        deleted_count = db.query(Call).filter(Call.start_time < cutoff_date).delete()
-        db.commit()
+        # Delete old calls in chunks so no single transaction holds the
+        # write lock for the whole cleanup
+        expired_ids = (
+            select(Call.id)
+            .where(Call.start_time < cutoff_date)
+            .limit(CLEANUP_BATCH_SIZE)
+            .scalar_subquery()
+        )
+        deleted_count = 0
+        while True:
+            result = db.execute(
+                delete(Call)
+                .where(Call.id.in_(expired_ids))
+                .execution_options(synchronize_session=False)
+            )
+            db.commit()
+            deleted_count += result.rowcount
+            if result.rowcount < CLEANUP_BATCH_SIZE:
+                break
 
         logger.info(f"Cleanup complete. Deleted {deleted_count} old calls.")
         return {"status": "success", "deleted_calls": deleted_count}
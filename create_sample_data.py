@@ -7,15 +7,20 @@ Run this script to populate the database with test data.
 from datetime import datetime, timedelta
 import random
 import uuid
+
+import numpy as np
 from faker import Faker
+from sqlalchemy import insert
 
+from app.analytics import upsert_agent_analytics
 from app.database import SessionLocal, engine
-from app.models import Call, Analytics, Base
+from app.models import Call, Base
 
 # Create tables if they don't exist
 Base.metadata.create_all(bind=engine)
 
 fake = Faker()
+rng = np.random.default_rng()
 
 def create_sample_calls(num_calls=20):
     """Create sample call data"""
@@ -36,61 +41,40 @@ def create_sample_calls(num_calls=20):
             "Hi there! I noticed you've been exploring our website. I'd love to help answer any questions you might have."
         ]
         
+        # Generate simple embeddings in one call (normally these would come from sentence transformers)
+        embeddings = rng.uniform(-1, 1, size=(num_calls, 384)).astype(np.float32)
+
+        # Generate some realistic AI insights for every call up front
+        sentiment_scores = rng.uniform(-0.3, 0.8, num_calls)  # Slightly positive bias
+        talk_ratios = rng.uniform(0.3, 0.7, num_calls)  # Agent talks 30-70% of time
+
+        records = []
         for i in range(num_calls):
             # Generate realistic call data
-            agent_id = random.choice(agents)
-            start_time = fake.date_time_between(start_date='-30d', end_date='now')
-            duration = random.randint(180, 1800)  # 3-30 minutes
-            transcript = random.choice(sample_transcripts)
-            
-            # Generate some realistic AI insights
-            sentiment_score = random.uniform(-0.3, 0.8)  # Slightly positive bias
-            talk_ratio = random.uniform(0.3, 0.7)  # Agent talks 30-70% of time
-            
-            # Generate a simple embedding (normally this would come from sentence transformers)
-            embedding = [random.uniform(-1, 1) for _ in range(384)]  # 384-dim embedding
-            
-            call = Call(
-                call_id=f"call_{i+1:04d}",
-                agent_id=agent_id,
-                customer_id=f"customer_{random.randint(1, 100):03d}",
-                language="en",
-                start_time=start_time,
-                duration_seconds=duration,
-                transcript=transcript,
-                agent_talk_ratio=talk_ratio,
-                customer_sentiment_score=sentiment_score,
-                created_at=datetime.utcnow(),
-                updated_at=datetime.utcnow()
-            )
-            
-            # Set embedding using the helper method
-            call.set_embedding(embedding)
-            
-            db.add(call)
-        
+            records.append({
+                "id": str(uuid.uuid4()),
+                "call_id": f"call_{i+1:04d}",
+                "agent_id": random.choice(agents),
+                "customer_id": f"customer_{random.randint(1, 100):03d}",
+                "language": "en",
+                "start_time": fake.date_time_between(start_date='-30d', end_date='now'),
+                "duration_seconds": random.randint(180, 1800),  # 3-30 minutes
+                "transcript": random.choice(sample_transcripts),
+                "agent_talk_ratio": float(talk_ratios[i]),
+                "customer_sentiment_score": float(sentiment_scores[i]),
+                "embedding": embeddings[i].tobytes(),
+            })
+
+        # Insert every row in one executemany instead of per-object unit-of-work
+        db.execute(insert(Call), records)
         db.commit()
         print(f"✅ Created {num_calls} sample calls")
-        
-        # Create some sample analytics
-        for agent_id in agents:
-            agent_calls = db.query(Call).filter(Call.agent_id == agent_id).all()
-            if agent_calls:
-                avg_sentiment = sum(c.customer_sentiment_score for c in agent_calls) / len(agent_calls)
-                avg_talk_ratio = sum(c.agent_talk_ratio for c in agent_calls) / len(agent_calls)
-                
-                analytics = Analytics(
-                    agent_id=agent_id,
-                    avg_sentiment=avg_sentiment,
-                    avg_talk_ratio=avg_talk_ratio,
-                    total_calls=len(agent_calls),
-                    last_updated=datetime.utcnow()
-                )
-                db.add(analytics)
-        
+
+        # Bring the per-agent analytics in line with the new calls
+        upsert_agent_analytics(db)
         db.commit()
         print(f"✅ Created analytics for {len(agents)} agents")
-        
+
     except Exception as e:
         print(f"❌ Error creating sample data: {e}")
         db.rollback()
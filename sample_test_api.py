@@ -12,12 +12,15 @@ import time
 BASE_URL = "http://localhost:8000/api/v1"
 SERVER_URL = "http://localhost:8000"
 
+# Reuse one keep-alive connection across every request in the run
+session = requests.Session()
+
 def test_calls_endpoint():
     """Test GET /api/v1/calls"""
     print("Testing GET /api/v1/calls...")
     
     # Test basic call
-    response = requests.get(f"{BASE_URL}/calls")
+    response = session.get(f"{BASE_URL}/calls")
     print(f"Status: {response.status_code}")
     print(f"Response: {json.dumps(response.json(), indent=2)[:200]}...")
     
@@ -28,7 +31,7 @@ def test_calls_endpoint():
         "min_sentiment": -1.0,
         "max_sentiment": 1.0
     }
-    response = requests.get(f"{BASE_URL}/calls", params=params)
+    response = session.get(f"{BASE_URL}/calls", params=params)
     print(f"With params - Status: {response.status_code}")
     print()
 
@@ -37,11 +40,11 @@ def test_call_detail_endpoint():
     print("Testing GET /api/v1/calls/{call_id}...")
     
     # First get a call ID from the calls endpoint
-    response = requests.get(f"{BASE_URL}/calls?limit=1")
+    response = session.get(f"{BASE_URL}/calls?limit=1")
     if response.status_code == 200 and response.json():
         call_id = response.json()[0]["call_id"]
         
-        detail_response = requests.get(f"{BASE_URL}/calls/{call_id}")
+        detail_response = session.get(f"{BASE_URL}/calls/{call_id}")
         print(f"Status: {detail_response.status_code}")
         if detail_response.status_code == 200:
             print("✓ Call detail retrieved successfully")
@@ -56,11 +59,11 @@ def test_recommendations_endpoint():
     print("Testing GET /api/v1/calls/{call_id}/recommendations...")
     
     # First get a call ID from the calls endpoint
-    response = requests.get(f"{BASE_URL}/calls?limit=1")
+    response = session.get(f"{BASE_URL}/calls?limit=1")
     if response.status_code == 200 and response.json():
         call_id = response.json()[0]["call_id"]
         
-        rec_response = requests.get(f"{BASE_URL}/calls/{call_id}/recommendations")
+        rec_response = session.get(f"{BASE_URL}/calls/{call_id}/recommendations")
         print(f"Status: {rec_response.status_code}")
         if rec_response.status_code == 200:
             data = rec_response.json()
@@ -76,7 +79,7 @@ def test_analytics_endpoint():
     """Test GET /api/v1/analytics/agents"""
     print("Testing GET /api/v1/analytics/agents...")
     
-    response = requests.get(f"{BASE_URL}/analytics/agents")
+    response = session.get(f"{BASE_URL}/analytics/agents")
     print(f"Status: {response.status_code}")
     
     if response.status_code == 200:
@@ -98,15 +101,15 @@ def test_server_health():
     
     try:
         # Test root endpoint
-        response = requests.get(SERVER_URL, timeout=5)
+        response = session.get(SERVER_URL, timeout=5)
         print(f"Root endpoint: {response.status_code}")
         
         # Test docs endpoint
-        response = requests.get(f"{SERVER_URL}/docs", timeout=5)
+        response = session.get(f"{SERVER_URL}/docs", timeout=5)
         print(f"Docs endpoint: {response.status_code}")
         
         # Test OpenAPI schema
-        response = requests.get(f"{SERVER_URL}/openapi.json", timeout=5)
+        response = session.get(f"{SERVER_URL}/openapi.json", timeout=5)
         print(f"OpenAPI schema: {response.status_code}")
         
         print("✅ Server is healthy and accessible\n")
@@ -127,7 +130,7 @@ def test_error_handling():
     print("🚨 Testing Error Handling...")
     
     # Test 404 for non-existent call
-    response = requests.get(f"{BASE_URL}/calls/non_existent_call")
+    response = session.get(f"{BASE_URL}/calls/non_existent_call")
     print(f"Non-existent call: {response.status_code} (expected: 404)")
     
     if response.status_code == 404:
@@ -135,11 +138,11 @@ def test_error_handling():
         print(f"✓ Proper error response: {error_data.get('detail')}")
     
     # Test invalid query parameters 
-    response = requests.get(f"{BASE_URL}/calls?limit=999")  # Over max limit
+    response = session.get(f"{BASE_URL}/calls?limit=999")  # Over max limit
     print(f"Invalid limit: {response.status_code}")
     
     # Test invalid sentiment range
-    response = requests.get(f"{BASE_URL}/calls?min_sentiment=2.0")  # Over max
+    response = session.get(f"{BASE_URL}/calls?min_sentiment=2.0")  # Over max
     print(f"Invalid sentiment: {response.status_code}")
     
     print("✅ Error handling tests completed\n")
@@ -150,7 +153,7 @@ def test_performance():
     
     # Test response time for calls endpoint
     start_time = time.time()
-    response = requests.get(f"{BASE_URL}/calls?limit=10")
+    response = session.get(f"{BASE_URL}/calls?limit=10")
     end_time = time.time()
     
     response_time = (end_time - start_time) * 1000  # Convert to ms
@@ -1,29 +1,43 @@
 import asyncio
-import json
+import csv
+import io
 import logging
+import math
 import os
 import random
 import sys
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
-from typing import Any, Dict, List
+from typing import Any, Dict, Iterator, List
 
 import aiohttp
+import numpy as np
+import orjson
 from faker import Faker
 
 # Add the project root to the path
 sys.path.append(os.path.dirname(os.path.dirname(os.path.realpath(__file__))))
 
+from sqlalchemy import String, insert, select, text
 from sqlalchemy.orm import Session
 
-from app.ai_insights import AIInsightModule
+from app.ai_insights import get_ai_module
+from app.analytics import upsert_agent_analytics
 from app.database import SessionLocal, engine
-from app.models import Analytics, Base, Call
+from app.models import Base, Call
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 fake = Faker()
-ai_module = AIInsightModule()
+ai_module = get_ai_module()  # Reuses models already loaded in this process
+
+# Threads for the blocking model calls made from the ingest coroutines
+inference_pool = ThreadPoolExecutor(max_workers=os.cpu_count())
+
+# Drop secondary indexes during the ingest even if calls already has rows
+BULK_LOAD = os.getenv("INGEST_BULK_LOAD", "false").lower() == "true"
 
 # Sample conversation templates for generating synthetic transcripts
 CONVERSATION_TEMPLATES = [
@@ -174,16 +188,47 @@ SAMPLE_DATA = {
 }
 
 
+# ID spaces for synthetic calls; a run can't ingest more calls than either
+CALL_ID_RANGE = range(100000, 1000000)
+CUSTOMER_ID_RANGE = range(10000, 100000)
+
+
+def shuffled_ids(id_range: range) -> Iterator[int]:
+    """Yield each ID in the range once, in random order, without storing them.
+
+    Stepping through the range by a stride coprime with its length visits
+    every value exactly once, so Faker's unique proxy doesn't have to track
+    the issued IDs.
+    """
+    size = len(id_range)
+    stride = random.randrange(1, size)
+    while math.gcd(stride, size) != 1:
+        stride = random.randrange(1, size)
+    offset = random.randrange(size)
+    for i in range(size):
+        yield id_range[(offset + i * stride) % size]
+
+
+CALL_IDS = shuffled_ids(CALL_ID_RANGE)
+CUSTOMER_IDS = shuffled_ids(CUSTOMER_ID_RANGE)
+
+
+class SampledFields(dict):
+    """Template fields that pick a random SAMPLE_DATA value on first lookup."""
+
+    def __missing__(self, key: str) -> str:
+        value = self[key] = random.choice(SAMPLE_DATA[key])
+        return value
+
+
 def generate_synthetic_transcript() -> Dict[str, Any]:
     """Generate a synthetic sales call transcript."""
     template = random.choice(CONVERSATION_TEMPLATES)
     customer_name = fake.first_name()
 
-    # Fill template with random sample data
-    transcript = template["template"]
-    transcript = transcript.format(
-        customer_name=customer_name,
-        **{key: random.choice(values) for key, values in SAMPLE_DATA.items()},
+    # Fill template with random sample data, drawing only the fields it uses
+    transcript = template["template"].format_map(
+        SampledFields(customer_name=customer_name)
     )
 
     # Generate call metadata
@@ -191,9 +236,9 @@ def generate_synthetic_transcript() -> Dict[str, Any]:
     duration = random.randint(300, 3600)  # 5 to 60 minutes
 
     call_data = {
-        "call_id": f"CALL_{fake.unique.random_int(min=100000, max=999999)}",
+        "call_id": f"CALL_{next(CALL_IDS)}",
         "agent_id": f"AGENT_{random.randint(1, 20)}",
-        "customer_id": f"CUST_{fake.unique.random_int(min=10000, max=99999)}",
+        "customer_id": f"CUST_{next(CUSTOMER_IDS)}",
         "language": "en",
         "start_time": start_time,
         "duration_seconds": duration,
@@ -204,142 +249,158 @@ def generate_synthetic_transcript() -> Dict[str, Any]:
     return call_data
 
 
-async def process_call_insights(call_data: Dict[str, Any]) -> Dict[str, Any]:
-    """Process AI insights for a call."""
+async def process_batch_insights(
+    calls: List[Dict[str, Any]]
+) -> List[Dict[str, Any]]:
+    """Process AI insights for a batch of calls."""
+    transcripts = [call_data["transcript"] for call_data in calls]
     try:
-        # Generate embedding
-        embedding = ai_module.generate_embedding(call_data["transcript"])
-
-        # Analyze sentiment
-        sentiment_score = ai_module.analyze_sentiment(call_data["transcript"])
-
-        # Calculate agent talk ratio
-        talk_ratio = ai_module.calculate_agent_talk_ratio(call_data["transcript"])
-
-        call_data.update(
-            {
-                "embedding": embedding,
-                "customer_sentiment_score": sentiment_score,
-                "agent_talk_ratio": talk_ratio,
-            }
+        # One batched forward pass per model instead of one per call. Torch
+        # releases the GIL, so running both in threads overlaps them and
+        # keeps the event loop free meanwhile
+        loop = asyncio.get_running_loop()
+        embeddings, sentiment_scores = await asyncio.gather(
+            loop.run_in_executor(
+                inference_pool, ai_module.generate_embeddings, transcripts
+            ),
+            loop.run_in_executor(
+                inference_pool, ai_module.analyze_sentiments, transcripts
+            ),
         )
 
-        return call_data
+        for call_data, embedding, sentiment_score in zip(
+            calls, embeddings, sentiment_scores
+        ):
+            call_data.update(
+                {
+                    "embedding": embedding,
+                    "customer_sentiment_score": sentiment_score,
+                    "agent_talk_ratio": ai_module.calculate_agent_talk_ratio(
+                        call_data["transcript"]
+                    ),
+                }
+            )
 
     except Exception as e:
-        logger.error(f"Error processing insights for call {call_data['call_id']}: {e}")
-        return call_data
-
-
-async def save_call_to_db(call_data: Dict[str, Any], db: Session):
-    """Save call data to database."""
+        logger.error(f"Error processing insights for batch: {e}")
+
+    return calls
+
+
+def copy_calls(records: List[Dict[str, Any]], db: Session):
+    """Stream call rows into PostgreSQL with COPY, skipping per-row INSERTs."""
+    columns = list(records[0])
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for record in records:
+        writer.writerow(
+            [
+                "\\x" + value.hex() if isinstance(value, bytes) else value
+                for value in (record[column] for column in columns)
+            ]
+        )
+    buffer.seek(0)
+
+    # csv writes both None and "" as an unquoted empty field, which COPY loads
+    # as NULL. Keep it NULL for the nullable numeric and binary columns, but
+    # force the text columns to load it as an empty string
+    text_columns = [
+        column
+        for column in columns
+        if isinstance(Call.__table__.c[column].type, String)
+    ]
+    cursor = db.connection().connection.cursor()
     try:
-        call = Call(
-            call_id=call_data["call_id"],
-            agent_id=call_data["agent_id"],
-            customer_id=call_data["customer_id"],
-            language=call_data["language"],
-            start_time=call_data["start_time"],
-            duration_seconds=call_data["duration_seconds"],
-            transcript=call_data["transcript"],
-            agent_talk_ratio=call_data.get("agent_talk_ratio"),
-            customer_sentiment_score=call_data.get("customer_sentiment_score"),
-            embedding=call_data.get("embedding"),
+        cursor.copy_expert(
+            f"COPY {Call.__tablename__} ({', '.join(columns)}) "
+            f"FROM STDIN WITH (FORMAT csv, FORCE_NOT_NULL ({', '.join(text_columns)}))",
+            buffer,
         )
+    finally:
+        cursor.close()
 
-        db.add(call)
+
+async def save_calls_to_db(calls: List[Dict[str, Any]], db: Session):
+    """Save a batch of calls to the database in one transaction."""
+    try:
+        records = [
+            {
+                "id": str(uuid.uuid4()),
+                "call_id": call_data["call_id"],
+                "agent_id": call_data["agent_id"],
+                "customer_id": call_data["customer_id"],
+                "language": call_data["language"],
+                "start_time": call_data["start_time"],
+                "duration_seconds": call_data["duration_seconds"],
+                "transcript": call_data["transcript"],
+                "agent_talk_ratio": call_data.get("agent_talk_ratio"),
+                "customer_sentiment_score": call_data.get("customer_sentiment_score"),
+                "embedding": (
+                    np.asarray(call_data["embedding"], dtype=np.float32).tobytes()
+                    if call_data.get("embedding")
+                    else None
+                ),
+            }
+            for call_data in calls
+        ]
+
+        # One bulk write and one commit per batch instead of per call
+        if db.get_bind().dialect.name == "postgresql":
+            copy_calls(records, db)
+        else:
+            # SQLite runs this as a single DBAPI executemany
+            db.execute(insert(Call), records)
         db.commit()
-        logger.info(f"Saved call {call_data['call_id']} to database")
+        logger.info(f"Saved {len(records)} calls to database")
 
     except Exception as e:
-        logger.error(f"Error saving call {call_data['call_id']}: {e}")
+        logger.error(f"Error saving batch of {len(calls)} calls: {e}")
         db.rollback()
 
 
-async def save_raw_transcript(call_data: Dict[str, Any]):
-    """Save raw transcript to JSON file for reproducibility."""
-    try:
-        os.makedirs("data/raw_transcripts", exist_ok=True)
+def _write_lines(filename: str, lines: List[bytes]):
+    os.makedirs(os.path.dirname(filename), exist_ok=True)
+    with open(filename, "wb") as f:
+        f.write(b"\n".join(lines) + b"\n")
 
-        filename = f"data/raw_transcripts/{call_data['call_id']}.json"
-        with open(filename, "w") as f:
-            # Make datetime serializable
-            serializable_data = {**call_data}
-            if isinstance(serializable_data["start_time"], datetime):
-                serializable_data["start_time"] = serializable_data[
-                    "start_time"
-                ].isoformat()
 
-            json.dump(serializable_data, f, indent=2)
+async def save_raw_transcripts(calls: List[Dict[str, Any]]):
+    """Save a batch's raw transcripts to one JSONL file for reproducibility."""
+    try:
+        # orjson writes datetimes as ISO 8601 natively
+        lines = [orjson.dumps(call_data) for call_data in calls]
+
+        # One file per batch, written off the event loop
+        filename = f"data/raw_transcripts/batch_{calls[0]['call_id']}.jsonl"
+        await asyncio.to_thread(_write_lines, filename, lines)
 
     except Exception as e:
-        logger.error(f"Error saving raw transcript for {call_data['call_id']}: {e}")
+        logger.error(f"Error saving raw transcripts for batch: {e}")
 
 
-async def ingest_batch(batch_size: int = 10):
+async def ingest_batch(db: Session, batch_size: int = 10):
     """Ingest a batch of calls with AI processing."""
-    db = SessionLocal()
-
     try:
-        tasks = []
-        for i in range(batch_size):
-            call_data = generate_synthetic_transcript()
+        calls = [generate_synthetic_transcript() for _ in range(batch_size)]
 
-            # Save raw transcript
-            await save_raw_transcript(call_data)
+        # Save raw transcripts
+        await save_raw_transcripts(calls)
 
-            # Process AI insights
-            call_with_insights = await process_call_insights(call_data)
+        # Process AI insights for the whole batch at once
+        calls = await process_batch_insights(calls)
 
-            # Save to database
-            await save_call_to_db(call_with_insights, db)
-
-            logger.info(f"Processed call {i+1}/{batch_size}")
+        # Save to database
+        await save_calls_to_db(calls, db)
 
     except Exception as e:
         logger.error(f"Error in batch ingestion: {e}")
-    finally:
-        db.close()
 
 
 async def update_analytics(db: Session):
     """Update the analytics table with aggregated data."""
     try:
-        # Get all agents
-        agents = db.query(Call.agent_id).distinct().all()
-
-        for (agent_id,) in agents:
-            # Calculate aggregated metrics
-            calls = db.query(Call).filter(Call.agent_id == agent_id).all()
-
-            if calls:
-                avg_sentiment = sum(
-                    call.customer_sentiment_score or 0 for call in calls
-                ) / len(calls)
-                avg_talk_ratio = sum(
-                    call.agent_talk_ratio or 0 for call in calls
-                ) / len(calls)
-                total_calls = len(calls)
-
-                # Update or create analytics record
-                analytics = (
-                    db.query(Analytics).filter(Analytics.agent_id == agent_id).first()
-                )
-
-                if analytics:
-                    analytics.avg_sentiment = avg_sentiment
-                    analytics.avg_talk_ratio = avg_talk_ratio
-                    analytics.total_calls = total_calls
-                    analytics.last_updated = datetime.utcnow()
-                else:
-                    analytics = Analytics(
-                        agent_id=agent_id,
-                        avg_sentiment=avg_sentiment,
-                        avg_talk_ratio=avg_talk_ratio,
-                        total_calls=total_calls,
-                    )
-                    db.add(analytics)
-
+        # One GROUP BY and upsert instead of a query per agent
+        upsert_agent_analytics(db)
         db.commit()
         logger.info("Analytics updated successfully")
 
@@ -348,6 +409,26 @@ async def update_analytics(db: Session):
         db.rollback()
 
 
+def calls_table_is_empty() -> bool:
+    """Check for existing calls on a connection separate from the ingest session."""
+    with engine.connect() as conn:
+        return conn.execute(select(Call.id).limit(1)).first() is None
+
+
+def drop_secondary_indexes(indexes):
+    """Drop non-unique call indexes so bulk inserts skip B-tree maintenance."""
+    for index in indexes:
+        index.drop(bind=engine, checkfirst=True)
+
+
+def create_secondary_indexes(indexes):
+    """Recreate dropped indexes and refresh the planner statistics."""
+    for index in indexes:
+        index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+
+
 async def main():
     """Main ingestion pipeline."""
     logger.info("Starting data ingestion pipeline...")
@@ -358,22 +439,42 @@ async def main():
     # Ingest calls in batches
     total_calls = 200
     batch_size = 20
+    max_calls = min(len(CALL_ID_RANGE), len(CUSTOMER_ID_RANGE))
+    if total_calls > max_calls:
+        raise ValueError(
+            f"Cannot generate {total_calls} calls with unique IDs; "
+            f"at most {max_calls} are available"
+        )
     batches = (total_calls + batch_size - 1) // batch_size
 
-    for batch_num in range(batches):
-        logger.info(f"Processing batch {batch_num + 1}/{batches}")
-        current_batch_size = min(batch_size, total_calls - batch_num * batch_size)
-        await ingest_batch(current_batch_size)
-
-        # Small delay to avoid overwhelming the system
-        await asyncio.sleep(1)
-
-    # Update analytics
-    db = SessionLocal()
-    try:
+    # Build secondary indexes once after the load instead of per insert.
+    # Queries on calls lose their indexes meanwhile, so only do this for an
+    # empty table or when INGEST_BULK_LOAD asks for it
+    if BULK_LOAD or calls_table_is_empty():
+        indexes = [index for index in Call.__table__.indexes if not index.unique]
+    else:
+        indexes = []
+
+    # One session for the whole run instead of one per batch
+    with SessionLocal() as db:
+        try:
+            drop_secondary_indexes(indexes)
+            for batch_num in range(batches):
+                logger.info(f"Processing batch {batch_num + 1}/{batches}")
+                current_batch_size = min(
+                    batch_size, total_calls - batch_num * batch_size
+                )
+                # Each batch is awaited to completion, including its commit,
+                # before the next one starts
+                await ingest_batch(db, current_batch_size)
+        finally:
+            # checkfirst recreates whichever indexes were dropped, even if
+            # dropping or ingesting stopped partway
+            if indexes:
+                create_secondary_indexes(indexes)
+
+        # Update analytics
         await update_analytics(db)
-    finally:
-        db.close()
 
     logger.info(f"Ingestion complete! Processed {total_calls} calls.")
 
@@ -4,20 +4,70 @@ from datetime import datetime
 
 import pytest
 from fastapi.testclient import TestClient
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, insert
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import StaticPool
 
 from app.database import Base, get_db
+from app.embedding_index import embedding_index
 from app.main import app
 from app.models import Analytics, Call
 
-# Use SQLite for testing
-SQLALCHEMY_DATABASE_URL = "sqlite:///./test.db"
+# Start time shared by the seeded test calls
+CALL_START = datetime(2023, 7, 1, 10, 0, 0)
+
+# Calls shared by the listing tests: 25 pagination rows plus two rows with
+# distinct agents and sentiments for the filter tests
+SEED_CALLS = [
+    {
+        "call_id": f"CALL_{i:03d}",
+        "agent_id": f"PAGE_AGENT_{i % 3}",
+        "customer_id": f"CUST_{i:03d}",
+        "language": "en",
+        "start_time": CALL_START,
+        "duration_seconds": 1800,
+        "transcript": f"Test transcript {i}",
+    }
+    for i in range(25)
+] + [
+    {
+        "call_id": "FILTER_CALL_1",
+        "agent_id": "AGENT_1",
+        "customer_id": "CUST_001",
+        "language": "en",
+        "start_time": CALL_START,
+        "duration_seconds": 1800,
+        "transcript": "Test transcript 1",
+        "customer_sentiment_score": 0.8,
+    },
+    {
+        "call_id": "FILTER_CALL_2",
+        "agent_id": "AGENT_2",
+        "customer_id": "CUST_002",
+        "language": "en",
+        "start_time": datetime(2023, 7, 2, 10, 0, 0),
+        "duration_seconds": 2400,
+        "transcript": "Test transcript 2",
+        "customer_sentiment_score": -0.2,
+    },
+]
+
+# Use an in-memory SQLite database for testing. StaticPool hands every
+# session the same connection, so they all see the same database. Each
+# pytest-xdist worker is its own process and so gets its own database
+SQLALCHEMY_DATABASE_URL = "sqlite://"
 
 engine = create_engine(
-    SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False}
+    SQLALCHEMY_DATABASE_URL,
+    connect_args={"check_same_thread": False},
+    poolclass=StaticPool,
+)
+# Objects keep their loaded state across commits, so tests can assert on
+# what they just wrote without a reload; refresh() explicitly when the
+# database changes a row behind the session's back (e.g. triggers)
+TestingSessionLocal = sessionmaker(
+    autocommit=False, autoflush=False, expire_on_commit=False, bind=engine
 )
-TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 
 @pytest.fixture(scope="session")
@@ -39,7 +89,23 @@ def db_session(test_db):
 
 
 @pytest.fixture
-def client(db_session):
+def seeded_calls(db_session):
+    """Insert SEED_CALLS in one executemany; rolled back with the test."""
+    db_session.execute(insert(Call), SEED_CALLS)
+    db_session.commit()
+    return SEED_CALLS
+
+
+@pytest.fixture(scope="session")
+def test_client():
+    """One TestClient for the whole session."""
+    return TestClient(app)
+
+
+@pytest.fixture
+def client(test_client, db_session):
+    """The shared TestClient, with get_db bound to this test's session."""
+
     def override_get_db():
         try:
             yield db_session
@@ -47,10 +113,18 @@ def client(db_session):
             pass
 
     app.dependency_overrides[get_db] = override_get_db
-    yield TestClient(app)
+    # Let the first recommendations request index this test's calls
+    embedding_index.clear()
+    yield test_client
     app.dependency_overrides.clear()
 
 
+@pytest.fixture
+def call_start():
+    """Start time of the seeded calls, for tests that add calls alongside them."""
+    return CALL_START
+
+
 @pytest.fixture
 def sample_call_data():
     return {
@@ -58,7 +132,7 @@ def sample_call_data():
         "agent_id": "AGENT_1",
         "customer_id": "CUST_001",
         "language": "en",
-        "start_time": datetime(2023, 7, 1, 10, 0, 0),
+        "start_time": CALL_START,
         "duration_seconds": 1800,
         "transcript": "Agent: Hello, how can I help you today?\nCustomer: I'm interested in your product.",
         "agent_talk_ratio": 0.6,
@@ -67,15 +141,38 @@ def sample_call_data():
     }
 
 
+@pytest.fixture
+def recommendation_call(request, db_session):
+    """A saved call; parametrize indirectly with True to give it an embedding."""
+    call = Call(
+        call_id="CALL_WITH_EMBEDDING" if request.param else "CALL_WITHOUT_EMBEDDING",
+        agent_id="AGENT_1",
+        customer_id="CUST_001",
+        language="en",
+        start_time=CALL_START,
+        duration_seconds=1800,
+        transcript="Agent: Hello, how can I help?\nCustomer: I need support.",
+        customer_sentiment_score=0.5,
+        agent_talk_ratio=0.6,
+    )
+    if request.param:
+        call.set_embedding([0.1, 0.2, 0.3, 0.4, 0.5])
+    db_session.add(call)
+    db_session.commit()
+    return call
+
+
 @pytest.fixture
 def sample_call(db_session, sample_call_data):
-    # Extract embedding to handle separately
-    embedding_data = sample_call_data.pop("embedding", None)
-    call = Call(**sample_call_data)
+    # Handle the embedding separately, without mutating the shared fixture
+    call_data = {
+        key: value for key, value in sample_call_data.items() if key != "embedding"
+    }
+    call = Call(**call_data)
 
     # Set embedding using the proper method
-    if embedding_data:
-        call.set_embedding(embedding_data)
+    if sample_call_data.get("embedding"):
+        call.set_embedding(sample_call_data["embedding"])
 
     db_session.add(call)
     db_session.commit()
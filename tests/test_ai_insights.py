@@ -1,5 +1,9 @@
+from types import SimpleNamespace
+
+import numpy as np
 import pytest
 
+from app import sim_kernels
 from app.ai_insights import AIInsightModule
 
 
@@ -36,6 +40,20 @@ def test_analyze_sentiment(ai_module):
     assert positive_score > negative_score
 
 
+def test_batch_inference(ai_module):
+    """Test that batched helpers return one result per input text."""
+    texts = ["I love this product!", "This is awful.", ""]
+
+    embeddings = ai_module.generate_embeddings(texts)
+    sentiments = ai_module.analyze_sentiments(texts)
+
+    assert len(embeddings) == len(texts)
+    assert all(len(embedding) == len(embeddings[0]) for embedding in embeddings)
+    assert np.allclose(np.linalg.norm(embeddings, axis=1), 1.0, atol=1e-4)
+    assert len(sentiments) == len(texts)
+    assert sentiments[0] > sentiments[1]
+
+
 def test_calculate_agent_talk_ratio(ai_module):
     """Test agent talk ratio calculation."""
     transcript = """Agent: Hello, how can I help you today?
@@ -84,6 +102,27 @@ def test_find_similar_calls(ai_module):
     assert similar_calls[0]["similarity_score"] > similar_calls[1]["similarity_score"]
 
 
+@pytest.mark.parametrize("writeable", [False, True])
+def test_find_similar_calls_ndarray_target(ai_module, writeable):
+    """Test ndarray targets: read-only ones work, caller-owned ones stay as-is."""
+    target_embedding = np.array([2.0, 0.0, 0.0], dtype=np.float32)
+    target_embedding.flags.writeable = writeable
+    call_embeddings = [
+        {
+            "call_id": "CALL_001",
+            "agent_id": "AGENT_1",
+            "embedding": [1.0, 0.0, 0.0],
+            "transcript": "Test transcript 1",
+        }
+    ]
+
+    similar_calls = ai_module.find_similar_calls(target_embedding, call_embeddings)
+
+    assert [call["call_id"] for call in similar_calls] == ["CALL_001"]
+    assert similar_calls[0]["similarity_score"] == pytest.approx(1.0)
+    np.testing.assert_array_equal(target_embedding, [2.0, 0.0, 0.0])
+
+
 def test_generate_coaching_nudges(ai_module):
     """Test coaching nudge generation."""
     transcript = "Agent: Hello. Customer: I'm not happy."
@@ -98,6 +137,48 @@ def test_generate_coaching_nudges(ai_module):
     assert all(len(nudge) <= 40 for nudge in nudges)
 
 
+def test_coaching_nudges_are_cached(ai_module, monkeypatch):
+    """Test that LLM nudges are reused for calls in the same buckets."""
+    requests = []
+
+    def mock_create(**kwargs):
+        requests.append(kwargs)
+        message = SimpleNamespace(content="Tip one\nTip two\nTip three")
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+
+    completions = SimpleNamespace(create=mock_create)
+    monkeypatch.setattr(
+        ai_module,
+        "openai_client",
+        SimpleNamespace(chat=SimpleNamespace(completions=completions)),
+    )
+
+    transcript = "Agent: Hello. Customer: I'm not happy."
+    first = ai_module.generate_coaching_nudges(transcript, -0.52, 0.31)
+    second = ai_module.generate_coaching_nudges(transcript, -0.48, 0.29)
+
+    assert first == second == ["Tip one", "Tip two", "Tip three"]
+    assert len(requests) == 1
+
+
+def test_batch_inference_deduplicates_texts(ai_module, monkeypatch):
+    """Test that repeated texts in a batch are encoded once."""
+    encoded = []
+
+    def mock_encode(texts, **kwargs):
+        encoded.extend(texts)
+        return np.ones((len(texts), 4), dtype=np.float32)
+
+    monkeypatch.setattr(
+        ai_module, "embedding_model", SimpleNamespace(encode=mock_encode)
+    )
+
+    embeddings = ai_module.generate_embeddings(["same call", "other call", "same call"])
+
+    assert sorted(encoded) == ["other call", "same call"]
+    assert embeddings[0] == embeddings[2] == [1.0] * 4
+
+
 def test_rule_based_nudges(ai_module):
     """Test rule-based nudge generation."""
     # Test low sentiment
@@ -141,3 +222,26 @@ def test_error_handling(ai_module, monkeypatch):
 
     embedding = ai_module.generate_embedding("test")
     assert embedding == []  # Should return empty list on error
+
+
+def test_cosine_scores_kernel():
+    """Test the similarity kernel against a plain NumPy reference."""
+    rng = np.random.default_rng(0)
+    matrix = rng.uniform(-1, 1, size=(8, 16)).astype(np.float32)
+    target = rng.uniform(-1, 1, size=16).astype(np.float32)
+    target /= np.linalg.norm(target)
+
+    expected = (matrix @ target) / np.linalg.norm(matrix, axis=1)
+    scores = sim_kernels.cosine_scores(matrix, target)
+
+    assert scores.shape == (8,)
+    assert np.allclose(scores, expected, atol=1e-5)
+
+
+def test_top_k_indices():
+    """Test top-k selection returns the best scores in descending order."""
+    scores = np.array([0.1, 0.9, -0.3, 0.5, 0.7], dtype=np.float32)
+
+    assert sim_kernels.top_k_indices(scores, 3).tolist() == [1, 4, 3]
+    assert sim_kernels.top_k_indices(scores, 10).tolist() == [1, 4, 3, 0, 2]
+    assert sim_kernels.top_k_indices(scores, 0).size == 0
@@ -1,8 +1,6 @@
-from datetime import datetime
-
 import pytest
-from fastapi.testclient import TestClient
 
+from app import api
 from app.models import Analytics, Call
 
 
@@ -21,7 +19,8 @@ def test_root_endpoint(client):
     """Test root endpoint."""
     response = client.get("/")
     assert response.status_code == 200
-    assert "Sales Call Analytics API" in response.json()["message"]
+    data = response.json()
+    assert "Sales Call Analytics API" in data["message"]
 
 
 def test_get_calls_empty(client):
@@ -41,37 +40,8 @@ def test_get_calls_with_data(client, sample_call):
     assert data[0]["agent_id"] == sample_call.agent_id
 
 
-def test_get_calls_with_filters(client, db_session):
+def test_get_calls_with_filters(client, seeded_calls):
     """Test get calls with various filters."""
-    # Create multiple test calls
-    calls_data = [
-        {
-            "call_id": "CALL_001",
-            "agent_id": "AGENT_1",
-            "customer_id": "CUST_001",
-            "language": "en",
-            "start_time": datetime(2023, 7, 1, 10, 0, 0),
-            "duration_seconds": 1800,
-            "transcript": "Test transcript 1",
-            "customer_sentiment_score": 0.8,
-        },
-        {
-            "call_id": "CALL_002",
-            "agent_id": "AGENT_2",
-            "customer_id": "CUST_002",
-            "language": "en",
-            "start_time": datetime(2023, 7, 2, 10, 0, 0),
-            "duration_seconds": 2400,
-            "transcript": "Test transcript 2",
-            "customer_sentiment_score": -0.2,
-        },
-    ]
-
-    for call_data in calls_data:
-        call = Call(**call_data)
-        db_session.add(call)
-    db_session.commit()
-
     # Test filter by agent_id
     response = client.get("/api/v1/calls?agent_id=AGENT_1")
     assert response.status_code == 200
@@ -100,31 +70,16 @@ def test_get_call_detail_not_found(client):
     """Test get call detail for non-existent call."""
     response = client.get("/api/v1/calls/NON_EXISTENT")
     assert response.status_code == 404
-    assert "Call not found" in response.json()["detail"]
+    data = response.json()
+    assert "Call not found" in data["detail"]
 
 
-def test_get_call_recommendations(client, db_session):
+@pytest.mark.parametrize("recommendation_call", [True], indirect=True)
+def test_get_call_recommendations(client, recommendation_call):
     """Test get call recommendations endpoint."""
-    # Create a call with embedding
-    call_data = {
-        "call_id": "CALL_WITH_EMBEDDING",
-        "agent_id": "AGENT_1",
-        "customer_id": "CUST_001",
-        "language": "en",
-        "start_time": datetime(2023, 7, 1, 10, 0, 0),
-        "duration_seconds": 1800,
-        "transcript": "Agent: Hello, how can I help?\nCustomer: I need support.",
-        "customer_sentiment_score": 0.5,
-        "agent_talk_ratio": 0.6,
-    }
-
-    call = Call(**call_data)
-    # Set embedding using the proper method
-    call.set_embedding([0.1, 0.2, 0.3, 0.4, 0.5])
-    db_session.add(call)
-    db_session.commit()
-
-    response = client.get(f"/api/v1/calls/{call.call_id}/recommendations")
+    response = client.get(
+        f"/api/v1/calls/{recommendation_call.call_id}/recommendations"
+    )
     assert response.status_code == 200
     data = response.json()
     assert "similar_calls" in data
@@ -132,12 +87,38 @@ def test_get_call_recommendations(client, db_session):
     assert len(data["coaching_nudges"]) <= 3
 
 
-def test_get_call_recommendations_no_embedding(client, sample_call):
-    """Test get call recommendations for call without embedding."""
-    # Remove embedding from sample call
-    sample_call.embedding = None
+def test_get_call_recommendations_similar_calls(client, db_session, call_start):
+    """Test similar calls come back with a truncated transcript preview."""
+    for i, embedding in enumerate([[0.1, 0.2, 0.3], [0.1, 0.2, 0.35]]):
+        call = Call(
+            call_id=f"SIMILAR_CALL_{i}",
+            agent_id=f"AGENT_{i}",
+            customer_id=f"CUST_{i:03d}",
+            language="en",
+            start_time=call_start,
+            duration_seconds=600,
+            transcript="Agent: Hello there. " * 50,
+            customer_sentiment_score=0.5,
+            agent_talk_ratio=0.5,
+        )
+        call.set_embedding(embedding)
+        db_session.add(call)
+    db_session.commit()
+
+    response = client.get("/api/v1/calls/SIMILAR_CALL_0/recommendations")
+    assert response.status_code == 200
+    similar_calls = response.json()["similar_calls"]
+    assert [call["call_id"] for call in similar_calls] == ["SIMILAR_CALL_1"]
+    preview = similar_calls[0]["transcript_preview"]
+    assert preview == ("Agent: Hello there. " * 10) + "..."
 
-    response = client.get(f"/api/v1/calls/{sample_call.call_id}/recommendations")
+
+@pytest.mark.parametrize("recommendation_call", [False], indirect=True)
+def test_get_call_recommendations_no_embedding(client, recommendation_call):
+    """Test get call recommendations for call without embedding."""
+    response = client.get(
+        f"/api/v1/calls/{recommendation_call.call_id}/recommendations"
+    )
     assert response.status_code == 400
     assert "Call embedding not available" in response.json()["detail"]
 
@@ -168,41 +149,101 @@ def test_get_agent_analytics_with_data(client, db_session):
     assert data["agents"][0]["total_calls"] == 5
 
 
-def test_pagination(client, db_session):
-    """Test pagination parameters."""
-    # Create multiple calls
-    for i in range(25):
-        call = Call(
-            call_id=f"CALL_{i:03d}",
-            agent_id=f"AGENT_{i % 3}",
-            customer_id=f"CUST_{i:03d}",
-            language="en",
-            start_time=datetime(2023, 7, 1, 10, 0, 0),
-            duration_seconds=1800,
-            transcript=f"Test transcript {i}",
+def test_get_agent_analytics_from_calls(client, db_session, call_start):
+    """Test agent analytics that the triggers maintain as calls are inserted."""
+    for i, sentiment in enumerate([0.2, 0.6]):
+        db_session.add(
+            Call(
+                call_id=f"AGG_CALL_{i}",
+                agent_id="AGENT_AGG",
+                customer_id=f"CUST_{i:03d}",
+                language="en",
+                start_time=call_start,
+                duration_seconds=600,
+                transcript="Test transcript",
+                customer_sentiment_score=sentiment,
+                agent_talk_ratio=0.5,
+            )
         )
-        db_session.add(call)
     db_session.commit()
 
-    # Test limit
-    response = client.get("/api/v1/calls?limit=10")
+    response = client.get("/api/v1/analytics/agents")
     assert response.status_code == 200
-    data = response.json()
-    assert len(data) == 10
+    agents = response.json()["agents"]
+    assert len(agents) == 1
+    assert agents[0]["agent_id"] == "AGENT_AGG"
+    assert agents[0]["avg_sentiment"] == pytest.approx(0.4)
+    assert agents[0]["avg_talk_ratio"] == pytest.approx(0.5)
+    assert agents[0]["total_calls"] == 2
+
+
+def test_get_agent_analytics_without_triggers(
+    client, db_session, monkeypatch, call_start
+):
+    """Test agent analytics aggregated from calls on dialects without triggers."""
+    monkeypatch.setattr(api, "ANALYTICS_TRIGGERS", {})
+    for i, sentiment in enumerate([0.2, None]):
+        db_session.add(
+            Call(
+                call_id=f"NO_TRIGGER_CALL_{i}",
+                agent_id="AGENT_NO_TRIGGER",
+                customer_id=f"CUST_{i:03d}",
+                language="en",
+                start_time=call_start,
+                duration_seconds=600,
+                transcript="Test transcript",
+                customer_sentiment_score=sentiment,
+            )
+        )
+    db_session.commit()
+    db_session.query(Analytics).delete()
+    db_session.commit()
 
-    # Test offset
-    response = client.get("/api/v1/calls?limit=10&offset=10")
+    response = client.get("/api/v1/analytics/agents")
+    assert response.status_code == 200
+    agents = response.json()["agents"]
+    assert [agent["agent_id"] for agent in agents] == ["AGENT_NO_TRIGGER"]
+    assert agents[0]["avg_sentiment"] == pytest.approx(0.2)
+    assert agents[0]["avg_talk_ratio"] is None
+    assert agents[0]["total_calls"] == 2
+
+
+def test_get_agent_analytics_not_modified(client, db_session):
+    """Test agent analytics revalidation with If-None-Match."""
+    db_session.add(Analytics(agent_id="AGENT_1", avg_sentiment=0.5, total_calls=1))
+    db_session.commit()
+
+    response = client.get("/api/v1/analytics/agents")
+    etag = response.headers["etag"]
+    assert "max-age" in response.headers["cache-control"]
+
+    cached = client.get("/api/v1/analytics/agents", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    db_session.add(Analytics(agent_id="AGENT_2", avg_sentiment=0.1, total_calls=1))
+    db_session.commit()
+    changed = client.get("/api/v1/analytics/agents", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.json()["agents"]) == 2
+
+
+@pytest.mark.parametrize(
+    "limit,offset,expected", [(10, 0, 10), (10, 10, 10), (10, 20, 7)]
+)
+def test_pagination(client, seeded_calls, limit, offset, expected):
+    """Test pagination parameters."""
+    response = client.get(f"/api/v1/calls?limit={limit}&offset={offset}")
     assert response.status_code == 200
     data = response.json()
-    assert len(data) == 10
+    assert len(data) == expected
 
 
-def test_invalid_parameters(client):
+@pytest.mark.parametrize(
+    "query",
+    ["limit=0", "limit=101", "offset=-1", "min_sentiment=2.0", "max_sentiment=-2.0"],
+)
+def test_invalid_parameters(client, query):
     """Test invalid query parameters."""
-    # Test invalid limit
-    response = client.get("/api/v1/calls?limit=0")
-    assert response.status_code == 422  # Validation error
-
-    # Test invalid sentiment range
-    response = client.get("/api/v1/calls?min_sentiment=2.0")
+    response = client.get(f"/api/v1/calls?{query}")
     assert response.status_code == 422  # Validation error
@@ -1,8 +1,5 @@
 import pytest
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
 
-from app.database import Base, get_db
 from app.models import Analytics, Call
 
 
@@ -26,7 +23,6 @@ class TestDatabase:
         call = Call(**call_data)
         db_session.add(call)
         db_session.commit()
-        db_session.refresh(call)
 
         # Verify the call was created
         assert call.id is not None
@@ -43,7 +39,6 @@ class TestDatabase:
         )
         db_session.add(analytics)
         db_session.commit()
-        db_session.refresh(analytics)
 
         # Verify the analytics was created
         assert analytics.id is not None
@@ -51,33 +46,89 @@ class TestDatabase:
         assert analytics.avg_sentiment == 0.75
         assert analytics.total_calls == 10
 
-    def test_call_embedding_methods(self, db_session, sample_call_data):
-        """Test Call model embedding methods."""
+    def test_analytics_triggers(self, db_session, sample_call_data):
+        """Test analytics rows track inserts, updates and deletes on calls."""
         call_data = sample_call_data.copy()
         call_data.pop("embedding", None)
 
-        call = Call(**call_data)
+        first = Call(**call_data)
+        second = Call(
+            **{**call_data, "call_id": "TEST_CALL_002", "customer_sentiment_score": 0.4}
+        )
+        db_session.add_all([first, second])
+        db_session.commit()
 
-        # Test setting embedding
-        test_embedding = [0.1, 0.2, 0.3]
-        call.set_embedding(test_embedding)
+        analytics = db_session.query(Analytics).filter_by(agent_id="AGENT_1").one()
+        assert analytics.total_calls == 2
+        assert analytics.avg_sentiment == pytest.approx(0.6)
 
-        db_session.add(call)
+        second.agent_id = "AGENT_2"
         db_session.commit()
-        db_session.refresh(call)
+        db_session.refresh(analytics)
+        assert analytics.total_calls == 1
+        assert analytics.avg_sentiment == pytest.approx(0.8)
 
-        # Test getting embedding
-        retrieved_embedding = call.embedding_list
-        assert retrieved_embedding == test_embedding
+        db_session.delete(first)
+        db_session.commit()
+        agents = [row.agent_id for row in db_session.query(Analytics).all()]
+        assert agents == ["AGENT_2"]
 
-    def test_call_duration_minutes_property(self, db_session, sample_call_data):
-        """Test Call model duration_minutes property."""
+    def test_analytics_triggers_skip_unscored_calls(
+        self, db_session, sample_call_data
+    ):
+        """Test that calls without scores don't count towards the averages."""
         call_data = sample_call_data.copy()
         call_data.pop("embedding", None)
-        call_data["duration_seconds"] = 3600  # 1 hour
+        call_data.update(agent_id="AGENT_UNSCORED", agent_talk_ratio=None)
+
+        scored = Call(**{**call_data, "customer_sentiment_score": 0.4})
+        unscored = Call(
+            **{
+                **call_data,
+                "call_id": "TEST_CALL_002",
+                "customer_sentiment_score": None,
+            }
+        )
+        db_session.add_all([scored, unscored])
+        db_session.commit()
 
-        call = Call(**call_data)
-        db_session.add(call)
+        analytics = (
+            db_session.query(Analytics).filter_by(agent_id="AGENT_UNSCORED").one()
+        )
+        assert analytics.total_calls == 2
+        assert analytics.avg_sentiment == pytest.approx(0.4)
+        assert analytics.avg_talk_ratio is None
+
+        db_session.delete(scored)
         db_session.commit()
+        db_session.refresh(analytics)
+        assert analytics.total_calls == 1
+        assert analytics.avg_sentiment is None
+
+    def test_call_embedding_methods(self):
+        """Test Call model embedding methods."""
+        call = Call()
+
+        # Test setting embedding
+        test_embedding = [0.1, 0.2, 0.3]
+        call.set_embedding(test_embedding)
+
+        # Test getting embedding
+        # Embeddings are stored as float32, so compare approximately
+        retrieved_embedding = call.embedding_list
+        assert retrieved_embedding == pytest.approx(test_embedding)
+
+    def test_set_embedding_on_saved_call(self, db_session, sample_call):
+        """Test that replacing an embedding on a saved call is persisted."""
+        sample_call.set_embedding([1.0, 2.0])
+        db_session.commit()
+        db_session.expire_all()
+
+        call = db_session.query(Call).filter_by(call_id=sample_call.call_id).one()
+        assert call.embedding_list == [1.0, 2.0]
+
+    def test_call_duration_minutes_property(self):
+        """Test Call model duration_minutes property."""
+        call = Call(duration_seconds=3600)  # 1 hour
 
         assert call.duration_minutes == 60.0
@@ -0,0 +1,138 @@
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from app import embedding_index as embedding_index_module
+from app.embedding_index import EmbeddingIndex
+from app.models import Call
+
+
+def _add_call(db_session, call_id, embedding):
+    call = Call(
+        call_id=call_id,
+        agent_id="AGENT_1",
+        customer_id="CUST_001",
+        language="en",
+        start_time=datetime(2023, 7, 1, 10, 0, 0),
+        duration_seconds=600,
+        transcript=f"Transcript for {call_id}",
+    )
+    call.set_embedding(embedding)
+    db_session.add(call)
+    db_session.commit()
+    return call
+
+
+def test_add_normalizes_rows():
+    """Test that rows are stored L2-normalized."""
+    index = EmbeddingIndex()
+    index.add("CALL_1", "AGENT_1", [3.0, 4.0])
+    index.add("CALL_2", "AGENT_2", [0.0, 2.0])
+
+    assert len(index) == 2
+    assert np.allclose(np.linalg.norm(index.matrix, axis=1), 1.0)
+
+
+def test_search_orders_and_excludes():
+    """Test top-k ordering and exclusion of the query call."""
+    index = EmbeddingIndex()
+    index.add("CALL_1", "AGENT_1", [1.0, 0.0, 0.0])
+    index.add("CALL_2", "AGENT_2", [0.9, 0.1, 0.0])
+    index.add("CALL_3", "AGENT_3", [0.0, 1.0, 0.0])
+
+    matches = index.search([1.0, 0.0, 0.0], top_k=2, exclude_call_id="CALL_1")
+
+    assert [match[0] for match in matches] == ["CALL_2", "CALL_3"]
+    assert matches[0][2] > matches[1][2]
+
+
+def test_search_dimension_mismatch():
+    """Test that a target with the wrong dimension returns no matches."""
+    index = EmbeddingIndex()
+    index.add("CALL_1", "AGENT_1", [1.0, 0.0, 0.0])
+
+    assert index.search([1.0, 0.0], top_k=5) == []
+
+
+def test_refresh_picks_up_new_calls(db_session):
+    """Test that refresh loads existing rows and appends new ones."""
+    index = EmbeddingIndex()
+    _add_call(db_session, "CALL_A", [0.1, 0.2, 0.3])
+    index.refresh(db_session)
+    assert index.ids == ["CALL_A"]
+
+    _add_call(db_session, "CALL_B", [0.3, 0.2, 0.1])
+    index.refresh(db_session)
+    assert sorted(index.ids) == ["CALL_A", "CALL_B"]
+
+
+def test_refresh_drops_deleted_calls(db_session):
+    """Test that deleted calls are removed on refresh."""
+    index = EmbeddingIndex()
+    call = _add_call(db_session, "CALL_A", [0.1, 0.2, 0.3])
+    _add_call(db_session, "CALL_B", [0.3, 0.2, 0.1])
+    index.refresh(db_session)
+
+    db_session.delete(call)
+    db_session.commit()
+    index.refresh(db_session)
+
+    assert index.ids == ["CALL_B"]
+
+
+def test_refresh_if_stale_waits_for_interval(db_session, monkeypatch):
+    """Test that refresh_if_stale only rechecks the table after the interval."""
+    index = EmbeddingIndex()
+    _add_call(db_session, "CALL_A", [0.1, 0.2, 0.3])
+    index.refresh_if_stale(db_session)
+
+    _add_call(db_session, "CALL_B", [0.3, 0.2, 0.1])
+    index.refresh_if_stale(db_session)
+    assert index.ids == ["CALL_A"]
+
+    monkeypatch.setattr(embedding_index_module, "REFRESH_INTERVAL", 0)
+    index.refresh_if_stale(db_session)
+    assert sorted(index.ids) == ["CALL_A", "CALL_B"]
+
+
+def test_search_with_ann_index(monkeypatch):
+    """Test that the HNSW path agrees with brute force on a small index."""
+    pytest.importorskip("faiss")
+    monkeypatch.setattr(embedding_index_module, "ANN_MIN_ROWS", 1)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(50, 16)).astype(np.float32)
+    index = EmbeddingIndex()
+    for i, vector in enumerate(vectors):
+        index.add(f"CALL_{i}", "AGENT_1", vector)
+
+    matches = index.search(vectors[0], top_k=3, exclude_call_id="CALL_0")
+
+    assert len(matches) == 3
+    assert "CALL_0" not in [match[0] for match in matches]
+    assert matches[0][2] >= matches[-1][2]
+
+
+def test_refresh_keeps_ann_index_for_new_calls(db_session, monkeypatch):
+    """Test that an append-only refresh extends the HNSW graph in place."""
+    pytest.importorskip("faiss")
+    monkeypatch.setattr(embedding_index_module, "ANN_MIN_ROWS", 50)
+
+    rng = np.random.default_rng(0)
+    vectors = rng.normal(size=(61, 16)).astype(np.float32)
+    for i, vector in enumerate(vectors[:60]):
+        _add_call(db_session, f"ANN_CALL_{i}", vector)
+    index = EmbeddingIndex()
+    index.refresh(db_session)
+    index.search(vectors[0], top_k=3)
+    ann = index._ann
+
+    # Written in the same second, so refresh reloads the old rows as well
+    _add_call(db_session, "ANN_CALL_60", vectors[60])
+    index.refresh(db_session)
+
+    assert index._ann is ann
+    matches = index.search(vectors[60], top_k=1)
+    assert index._ann is ann
+    assert matches[0][0] == "ANN_CALL_60"
@@ -0,0 +1,49 @@
+from app.inference_cache import InferenceCache, simhash
+
+TRANSCRIPT = """Agent: Good morning Alice, thank you for your interest in our product.
+Customer: Hi, I've been looking for a solution to help with tracking sales pipeline.
+Agent: Perfect! Our SalesFlow Pro is designed specifically for that. Let me show you how it works.
+Customer: That sounds interesting. What makes it different from HubSpot?
+Agent: Great question! The key difference is seamless integrations. Would you like to see a demo?
+Customer: Yes, that would be helpful.
+Agent: Excellent! I'll schedule a follow-up demo for you. What's your timeline for implementation?
+Customer: We're looking at within 3 months. What about pricing?
+Agent: I'll prepare a custom quote based on your needs. Can we schedule that demo for next week?
+Customer: Sounds good!"""
+
+
+def test_exact_hit():
+    """Test that identical text returns the cached value."""
+    cache = InferenceCache()
+    cache.put(TRANSCRIPT, 0.5)
+
+    assert cache.get(TRANSCRIPT) == 0.5
+    assert cache.get(TRANSCRIPT + " extra") is None
+
+
+def test_lru_eviction():
+    """Test that the least recently used entry is evicted first."""
+    cache = InferenceCache(maxsize=2)
+    cache.put("first", 1)
+    cache.put("second", 2)
+    cache.get("first")
+    cache.put("third", 3)
+
+    assert len(cache) == 2
+    assert cache.get("first") == 1
+    assert cache.get("second") is None
+
+
+def test_near_duplicate_hit():
+    """Test that a re-punctuated transcript hits the SimHash lookup."""
+    near_duplicate = TRANSCRIPT.replace("Sounds good!", "sounds good.")
+    assert bin(simhash(TRANSCRIPT) ^ simhash(near_duplicate)).count("1") <= 3
+
+    exact_only = InferenceCache()
+    exact_only.put(TRANSCRIPT, 0.5)
+    assert exact_only.get(near_duplicate) is None
+
+    cache = InferenceCache(near_duplicates=True)
+    cache.put(TRANSCRIPT, 0.5)
+    assert cache.get(near_duplicate) == 0.5
+    assert cache.get("Customer: This is terrible and I want a refund.") is None
@@ -1,8 +1,10 @@
-import pytest
-from fastapi.testclient import TestClient
-
 from app.main import app
 
+ROUTE_PATHS = frozenset(route.path for route in app.routes)
+MIDDLEWARE_NAMES = frozenset(
+    middleware.cls.__name__ for middleware in app.user_middleware
+)
+
 
 class TestMainApp:
     """Test main application functionality."""
@@ -16,17 +18,13 @@ class TestMainApp:
     def test_middleware_setup(self):
         """Test that CORS middleware is properly configured."""
         # Check if CORS middleware is in the middleware stack
-        middleware_classes = [
-            middleware.cls.__name__ for middleware in app.user_middleware
-        ]
-        assert "CORSMiddleware" in middleware_classes
+        assert "CORSMiddleware" in MIDDLEWARE_NAMES
 
     def test_router_inclusion(self):
         """Test that API router is included."""
         # Check if our API routes are included
-        route_paths = [route.path for route in app.routes]
-        assert "/api/v1/calls" in route_paths
-        assert "/api/v1/analytics/agents" in route_paths
+        assert "/api/v1/calls" in ROUTE_PATHS
+        assert "/api/v1/analytics/agents" in ROUTE_PATHS
 
     def test_lifespan_events(self):
         """Test that lifespan events are configured."""
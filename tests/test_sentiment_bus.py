@@ -0,0 +1,83 @@
+import asyncio
+import json
+from datetime import datetime
+
+from app.models import Call
+from app.schemas import SentimentUpdate
+from app.sentiment_bus import SentimentBus, publish_changed_sentiments, sentiment_bus
+
+
+def test_websocket_receives_published_updates(client):
+    """Test that published updates reach websocket subscribers of that call."""
+    with client.websocket_connect("/api/v1/ws/sentiment/CALL_WS") as websocket:
+        assert sentiment_bus.subscriber_count("CALL_WS") == 1
+
+        sentiment_bus.publish(
+            SentimentUpdate(
+                call_id="CALL_OTHER", sentiment_score=-0.5, timestamp=datetime.utcnow()
+            )
+        )
+        sentiment_bus.publish(
+            SentimentUpdate(
+                call_id="CALL_WS", sentiment_score=0.25, timestamp=datetime.utcnow()
+            )
+        )
+
+        update = websocket.receive_json()
+        assert update["call_id"] == "CALL_WS"
+        assert update["sentiment_score"] == 0.25
+
+
+def test_full_queue_drops_oldest_update():
+    """Test that a slow subscriber keeps only the most recent updates."""
+
+    async def scenario():
+        bus = SentimentBus(queue_size=2)
+        queue = bus.subscribe("CALL_SLOW")
+        for score in (0.1, 0.2, 0.3):
+            bus.publish(
+                SentimentUpdate(
+                    call_id="CALL_SLOW",
+                    sentiment_score=score,
+                    timestamp=datetime.utcnow(),
+                )
+            )
+        await asyncio.sleep(0)
+        return [json.loads(queue.get_nowait())["sentiment_score"] for _ in range(2)]
+
+    assert asyncio.run(scenario()) == [0.2, 0.3]
+
+
+def test_websocket_receives_scored_calls(client, db_session):
+    """Test that scores written to the calls table reach websocket subscribers."""
+    call = Call(
+        call_id="CALL_SCORED",
+        agent_id="AGENT_1",
+        customer_id="CUST_001",
+        language="en",
+        start_time=datetime(2023, 7, 1, 10, 0, 0),
+        duration_seconds=600,
+        transcript="Agent: Hello",
+        customer_sentiment_score=0.4,
+    )
+    db_session.add(call)
+    db_session.commit()
+    published = {}
+
+    with client.websocket_connect("/api/v1/ws/sentiment/CALL_SCORED") as websocket:
+        assert publish_changed_sentiments(db_session, sentiment_bus, published) == 1
+        assert websocket.receive_json()["sentiment_score"] == 0.4
+
+        # Unchanged rows are not sent again
+        assert publish_changed_sentiments(db_session, sentiment_bus, published) == 0
+
+        call.customer_sentiment_score = -0.3
+        db_session.commit()
+        assert publish_changed_sentiments(db_session, sentiment_bus, published) == 1
+        assert websocket.receive_json()["sentiment_score"] == -0.3
+
+        # A late subscriber starts from the latest score
+        with client.websocket_connect("/api/v1/ws/sentiment/CALL_SCORED") as late:
+            assert late.receive_json()["sentiment_score"] == -0.3
+
+    assert sentiment_bus.subscriber_count("CALL_SCORED") == 0
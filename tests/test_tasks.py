@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import text
+
+from app import tasks
+from app.models import Analytics, Call
+
+
+@pytest.fixture
+def task_session(db_session, monkeypatch):
+    """Run tasks inside the test transaction."""
+    monkeypatch.setattr(tasks, "SessionLocal", lambda: db_session)
+    return db_session
+
+
+def test_recalculate_analytics(task_session, monkeypatch):
+    """Test that recalculation rebuilds drifted analytics rows from calls."""
+    monkeypatch.setattr("app.analytics.UPSERT_CHUNK_SIZE", 1)
+    for i, (agent_id, sentiment) in enumerate(
+        [("AGENT_1", 0.2), ("AGENT_1", None), ("AGENT_2", 0.9)]
+    ):
+        task_session.add(
+            Call(
+                call_id=f"TASK_CALL_{i}",
+                agent_id=agent_id,
+                customer_id=f"CUST_{i:03d}",
+                language="en",
+                start_time=datetime(2023, 7, 1, 10, 0, 0),
+                duration_seconds=600,
+                transcript="Test transcript",
+                customer_sentiment_score=sentiment,
+                agent_talk_ratio=0.5,
+            )
+        )
+    task_session.commit()
+    task_session.execute(
+        text("UPDATE analytics SET avg_sentiment = 1.0, total_calls = 99")
+    )
+
+    result = tasks.recalculate_analytics()
+
+    assert result == {"status": "success", "updated_agents": 2}
+    analytics = {row.agent_id: row for row in task_session.query(Analytics)}
+    assert analytics["AGENT_1"].total_calls == 2
+    assert analytics["AGENT_1"].scored_sentiment_calls == 1
+    assert analytics["AGENT_1"].avg_sentiment == pytest.approx(0.2)
+    assert analytics["AGENT_2"].total_calls == 1
+    assert analytics["AGENT_2"].avg_sentiment == pytest.approx(0.9)
+
+
+def test_cleanup_old_calls(task_session, monkeypatch):
+    """Test that cleanup deletes only expired calls, across several batches."""
+    monkeypatch.setattr(tasks, "CLEANUP_BATCH_SIZE", 2)
+    now = datetime.utcnow()
+    for i, age in enumerate([200, 150, 120, 100, 10]):
+        task_session.add(
+            Call(
+                call_id=f"CLEANUP_CALL_{i}",
+                agent_id="AGENT_1",
+                customer_id=f"CUST_{i:03d}",
+                language="en",
+                start_time=now - timedelta(days=age),
+                duration_seconds=600,
+                transcript="Test transcript",
+            )
+        )
+    task_session.commit()
+
+    result = tasks.cleanup_old_calls(days_to_keep=90)
+
+    assert result == {"status": "success", "deleted_calls": 4}
+    assert [call.call_id for call in task_session.query(Call)] == ["CLEANUP_CALL_4"]